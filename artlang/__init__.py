@@ -0,0 +1,8 @@
+"""The ArtLang compiler.
+
+The stages are my_scanner (source -> tokens), my_parser (tokens -> AST) and
+story_generator (AST -> story), each also runnable on its own with
+`python -m artlang.<stage>`; cli is the pipeline running them, behind the
+`artlang` command. Nothing is imported here, so that a command only loads
+the modules it uses.
+"""
@@ -0,0 +1,108 @@
+"""AST nodes: tuples tagged with a small-int kind.
+
+The parser builds each node as a tuple whose first item is its kind, with
+sequences of nodes or names as tuples too:
+
+    (CHARACTER_BLOCK, characters)       a top-level 'Characters' block
+    (CHARACTER, name, definition)
+    (EVIL, value)                       restricted assignments
+    (STRENGTH, value)
+    (TRAIT_LIST, traits)
+    (SCENE_BLOCK_LIST, scenes)          a top-level 'Scenes' block
+    (SCENE, name, details)
+    (LOCATION, location)
+    (EVENT, event)
+    (CHARACTERS_PRESENT, characters)
+    (WRITE_STORY,)                      instruction blocks
+    (PRINT_CHARACTERS, characters)
+
+A definition may also hold None, for an assignment missing its '='. Names
+are interned through a symbol table, so every mention of a character is the
+same string object, and the default evil and strength nodes are shared by
+all the characters that use them. to_json() gives the dicts and lists of the
+original ast.json for a node; from_json() reads them back.
+"""
+
+# Node kinds
+(CHARACTER_BLOCK, CHARACTER, EVIL, STRENGTH, TRAIT_LIST,
+ SCENE_BLOCK_LIST, SCENE, LOCATION, EVENT, CHARACTERS_PRESENT,
+ WRITE_STORY, PRINT_CHARACTERS) = range(12)
+
+# The assignments the parser adds to a character that doesn't make them
+DEFAULT_EVIL = (EVIL, False)
+DEFAULT_STRENGTH = (STRENGTH, 0)
+
+def intern_symbol(symbols, value):
+    """The symbols table's copy of a string value; other values are returned as they are."""
+    # numbers and booleans are not interned: True == 1 would share an entry
+    if value.__class__ is str:
+        return symbols.setdefault(value, value)
+    return value
+
+def to_json(node):
+    """The JSON form of a node (or None): the dicts and lists the parser used to build."""
+    if node is None:
+        return None
+    return JSON_VIEWS[node[0]](node)
+
+def nodes_to_json(nodes):
+    return [to_json(node) for node in nodes]
+
+# kind -> function from a node to its JSON form
+JSON_VIEWS = (
+    lambda node: nodes_to_json(node[1]),
+    lambda node: {"type": "character_block", "name": node[1], "definition": nodes_to_json(node[2])},
+    lambda node: {"type": "restricted_assignment", "evil": node[1]},
+    lambda node: {"type": "restricted_assignment", "strength": node[1]},
+    lambda node: {"type": "trait_list", "traits": list(node[1])},
+    lambda node: {"type": "scene_block_list", "scenes": nodes_to_json(node[1])},
+    lambda node: {"type": "scene_block", "name": node[1], "details": nodes_to_json(node[2])},
+    lambda node: {"type": "location_assignment", "location": node[1]},
+    lambda node: {"type": "event_assignment", "event": node[1]},
+    lambda node: {"type": "characters_present", "characters": list(node[1])},
+    lambda node: {"type": "instruction_block", "instruction": "write story"},
+    lambda node: {"type": "instruction_block", "instruction": "print characters", "characters": list(node[1])},
+)
+
+def from_json(node, symbols=None):
+    """The node for the JSON form of a top-level block or any node inside one.
+
+    Names are interned in symbols (a dict), which may be shared across blocks.
+    """
+    if symbols is None:
+        symbols = {}
+    if node is None:
+        return None
+    if isinstance(node, list):
+        return (CHARACTER_BLOCK, tuple(from_json(character, symbols) for character in node))
+
+    def names(values):
+        return tuple(intern_symbol(symbols, value) for value in values)
+
+    node_type = node["type"]
+    if node_type == "character_block":
+        definition = tuple(from_json(detail, symbols) for detail in node["definition"])
+        return (CHARACTER, intern_symbol(symbols, node["name"]), definition)
+    elif node_type == "restricted_assignment":
+        if "evil" in node:
+            return DEFAULT_EVIL if node["evil"] is False else (EVIL, node["evil"])
+        value = node["strength"]
+        return DEFAULT_STRENGTH if value.__class__ is int and value == 0 else (STRENGTH, value)
+    elif node_type == "trait_list":
+        return (TRAIT_LIST, names(node["traits"]))
+    elif node_type == "scene_block_list":
+        return (SCENE_BLOCK_LIST, tuple(from_json(scene, symbols) for scene in node["scenes"]))
+    elif node_type == "scene_block":
+        details = tuple(from_json(detail, symbols) for detail in node["details"])
+        return (SCENE, intern_symbol(symbols, node["name"]), details)
+    elif node_type == "location_assignment":
+        return (LOCATION, intern_symbol(symbols, node["location"]))
+    elif node_type == "event_assignment":
+        return (EVENT, intern_symbol(symbols, node["event"]))
+    elif node_type == "characters_present":
+        return (CHARACTERS_PRESENT, names(node["characters"]))
+    elif node_type == "instruction_block":
+        if node["instruction"] == "write story":
+            return (WRITE_STORY,)
+        return (PRINT_CHARACTERS, names(node["characters"]))
+    raise ValueError(f"Unknown AST node type '{node_type}'")
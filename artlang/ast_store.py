@@ -0,0 +1,177 @@
+"""AST file formats, and lazy loading of the top-level blocks.
+
+    json      json.dump(ast, indent=4), the original human-readable ast.json
+    compact   minified JSON with each top-level block on its own line; still a
+              valid JSON document, about a third the size of the indented form
+    binary    b'ARTA', u8 version, then each top-level block as marshal data,
+              then an index: u32 block count, a u64 offset per block and a u8
+              kind per block, followed by the u64 offset of the index
+              (integers little-endian)
+
+The JSON forms are ast_nodes.to_json() of the blocks; the binary form holds
+the node tuples themselves. Compact and binary ASTs load as a LazyAST, which
+decodes a block the first time it is indexed, and tells a block's kind
+without decoding it: a program that only prints characters never decodes its
+scenes.
+"""
+import json
+import marshal
+import struct
+from collections.abc import Sequence
+from . import ast_nodes
+
+AST_FORMATS = ("json", "compact", "binary")
+
+MAGIC = b'ARTA'
+VERSION = 3
+MARSHAL_VERSION = 4	# fixed, so the files don't change with the Python version writing them
+
+HEADER = struct.Struct('<4sB')
+COUNT = struct.Struct('<I')
+OFFSET = struct.Struct('<Q')
+
+# Kinds of top-level block, by their code in the binary index
+CHARACTERS = "characters"
+SCENES = "scenes"
+INSTRUCTION = "instruction"
+BLOCK_KINDS = (None, CHARACTERS, SCENES, INSTRUCTION)
+
+# Start of a compact block line for each kind of dict block
+COMPACT_PREFIXES = ((b'{"type":"scene_block_list"', SCENES), (b'{"type":"instruction_block"', INSTRUCTION))
+
+class ASTFormatError(Exception):
+    pass
+
+# ast_nodes kind of a top-level block -> its kind here
+NODE_BLOCK_KINDS = {
+    ast_nodes.CHARACTER_BLOCK: CHARACTERS,
+    ast_nodes.SCENE_BLOCK_LIST: SCENES,
+    ast_nodes.WRITE_STORY: INSTRUCTION,
+    ast_nodes.PRINT_CHARACTERS: INSTRUCTION,
+}
+
+def block_kind(block):
+    """CHARACTERS, SCENES or INSTRUCTION for a top-level block, or None."""
+    return NODE_BLOCK_KINDS.get(block[0])
+
+class LazyAST(Sequence):
+    """A read-only list of top-level blocks, decoded on first access."""
+
+    def __init__(self, count, decode_block, kind_of):
+        self.count = count
+        self.decode_block = decode_block	# index -> block
+        self.kind_of = kind_of	# index -> block_kind() of the block, without decoding it
+        self.blocks = {}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("list index out of range")
+        block = self.blocks.get(index)
+        if block is None:
+            block = self.blocks[index] = self.decode_block(index)
+        return block
+
+    def __repr__(self):
+        return f"<LazyAST of {self.count} blocks, {len(self.blocks)} decoded>"
+
+def compact_block(block):
+    return json.dumps(ast_nodes.to_json(block), separators=(',', ':'))
+
+def write_ast(ast, file_path, ast_format="json"):
+    """Write the AST (any iterable of top-level blocks) to file_path in ast_format."""
+    if ast_format not in AST_FORMATS:
+        raise ValueError(f"Unknown AST format '{ast_format}'")
+    with open(file_path, "wb" if ast_format == "binary" else "w") as outfile:
+        write_ast_file(ast, outfile, ast_format)
+
+def write_ast_file(ast, outfile, ast_format="json"):
+    """Write the AST to an open file, which may be a pipe: text for the JSON formats, binary for binary."""
+    if ast_format == "json":
+        json.dump([ast_nodes.to_json(block) for block in ast], outfile, indent=4)
+    elif ast_format == "compact":
+        separator = "[\n"
+        for block in ast:
+            # ensure_ascii escapes any newline inside a string, so a block is always one line
+            outfile.write(separator + compact_block(block))
+            separator = ",\n"
+        outfile.write("[]" if separator == "[\n" else "\n]")
+    elif ast_format == "binary":
+        outfile.write(HEADER.pack(MAGIC, VERSION))
+        position = HEADER.size	# counted rather than tell()'d, so a pipe works too
+        offsets = []
+        kinds = bytearray()
+        for block in ast:
+            offsets.append(position)
+            kinds.append(BLOCK_KINDS.index(block_kind(block)))
+            data = marshal.dumps(block, MARSHAL_VERSION)
+            outfile.write(data)
+            position += len(data)
+        outfile.write(COUNT.pack(len(offsets)))
+        outfile.write(b''.join(OFFSET.pack(offset) for offset in offsets))
+        outfile.write(kinds)
+        outfile.write(OFFSET.pack(position))
+    else:
+        raise ValueError(f"Unknown AST format '{ast_format}'")
+
+def load_ast(file_path):
+    """Load an AST written in any format: a list for indented JSON, otherwise a LazyAST."""
+    with open(file_path, "rb") as infile:
+        return load_ast_data(infile.read(), file_path)
+
+def load_ast_data(data, file_path):
+    """load_ast for the bytes of an AST file, eg. read from a pipe; file_path names it in errors."""
+    if data.startswith(MAGIC):
+        return load_binary(data, file_path)
+    if data.startswith(b"[\n") and data[2:3] not in (b" ", b"\n", b"]"):
+        return load_compact(data)
+    symbols = {}
+    return [ast_nodes.from_json(block, symbols) for block in json.loads(data)]
+
+def load_compact(data):
+    # lines: '[', one block per line ending in ',' except the last, then ']'
+    lines = data.split(b"\n")[1:-1]
+
+    def kind_of(index):
+        line = lines[index]
+        if line.startswith(b"["):
+            return CHARACTERS
+        for prefix, kind in COMPACT_PREFIXES:
+            if line.startswith(prefix):
+                return kind
+        return None
+
+    symbols = {}	# shared by the blocks, so a name mentioned in several is one string
+    return LazyAST(len(lines), lambda index: ast_nodes.from_json(json.loads(lines[index].rstrip(b",")), symbols), kind_of)
+
+def load_binary(data, file_path):
+    if len(data) < HEADER.size + COUNT.size + OFFSET.size:
+        raise ASTFormatError(f"AST file '{file_path}' is truncated")
+    _, version = HEADER.unpack_from(data, 0)
+    if version != VERSION:
+        raise ASTFormatError(f"Unsupported AST format version {version} in '{file_path}'")
+    index_offset, = OFFSET.unpack_from(data, len(data) - OFFSET.size)
+    try:
+        count, = COUNT.unpack_from(data, index_offset)
+        offsets = [OFFSET.unpack_from(data, index_offset + COUNT.size + i * OFFSET.size)[0] for i in range(count)]
+    except struct.error:
+        raise ASTFormatError(f"Corrupt index in AST file '{file_path}'")
+    kinds_offset = index_offset + COUNT.size + count * OFFSET.size
+    kinds = data[kinds_offset:kinds_offset + count]
+    if len(kinds) != count or max(kinds, default=0) >= len(BLOCK_KINDS):
+        raise ASTFormatError(f"Corrupt index in AST file '{file_path}'")
+    ends = offsets[1:] + [index_offset]
+
+    def decode_block(index):
+        try:
+            return marshal.loads(data[offsets[index]:ends[index]])
+        except (EOFError, ValueError, TypeError) as e:
+            raise ASTFormatError(f"Corrupt block {index} in AST file '{file_path}': {e}")
+
+    return LazyAST(count, decode_block, lambda index: BLOCK_KINDS[kinds[index]])
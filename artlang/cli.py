@@ -0,0 +1,1009 @@
+"""The ArtLang compilation pipeline: the `artlang` command and ArtLang.py.
+
+Only what the command line asks for is imported: each stage module is loaded
+when its stage runs (a compile served from the cache loads none of them), and
+the modules behind --pipeline, --batch and --serve only with those flags.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+from .diagnostics import SemanticError, SEMANTIC_ERROR_STATUS
+
+PYTHON_EXECUTABLE = sys.executable
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The stage modules --isolated and --pipeline run with `python -m`
+SCANNER_MODULE = f"{__package__}.my_scanner"
+PARSER_MODULE = f"{__package__}.my_parser"
+STORYGEN_MODULE = f"{__package__}.story_generator"
+
+# Where --incremental keeps the previous compile, inside the output folder
+INCREMENTAL_STATE = ".incremental_state"
+
+# What --emit can select, in stage order
+ARTIFACTS = ("tokens", "ast", "story")
+
+# --watch: seconds between polls of the watched files, and how long a changed
+# file must stay unchanged before it is recompiled (a burst of saves is one rebuild)
+WATCH_INTERVAL = 0.025
+WATCH_SETTLE = 0.05
+
+# Bytes moved per read between the --pipeline stages
+PIPE_CHUNK = 1 << 16
+
+# Token file name for each --token-format
+TOKEN_FILES = {
+    "binary": "tokens.bin",
+    "text": "tokens.txt",
+}
+
+# AST file name for each --ast-format
+AST_FILES = {
+    "json": "ast.json",
+    "compact": "ast.json",
+    "binary": "ast.bin",
+}
+
+def stage_env():
+    """The environment of the stage subprocesses: the package importable, even when it isn't installed."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.dirname(PACKAGE_DIR), env.get("PYTHONPATH")]))
+    return env
+
+def run_command(command, working_dir=None):
+    import subprocess
+    try:
+        result = subprocess.run(
+            command, 
+            cwd=working_dir, 
+            env=stage_env(),
+            capture_output=True, 
+            text=True, 
+            check=True  # This will raise CalledProcessError if returncode is non-zero
+        )
+        return result.stdout, result.stderr
+    except subprocess.CalledProcessError as e:
+        if e.returncode == SEMANTIC_ERROR_STATUS:
+            # the generator listed the program's errors: report them as in-process mode does
+            raise SemanticError.from_output(e.stderr) from None
+        print(f"Error running command: {' '.join(command)}")
+        print(f"Error output: {e.stderr}")
+        print(f"Return code: {e.returncode}")
+        raise
+
+def relay_warnings(output):
+    """Print the semantic warnings in a story generator's captured output, and return them."""
+    warnings = "".join(line + "\n" for line in output.splitlines() if line.startswith("Warning: "))
+    sys.stderr.write(warnings)
+    return warnings
+
+def stage_command(profiler, output_folder, stage, module, *args):
+    """The command line running a stage module as a subprocess."""
+    # --profile-stage runs that stage's module under cProfile, writing <stage>.prof
+    if profiler is not None and profiler.cprofile_stage == stage:
+        profile_file = os.path.join(output_folder, f"{stage}.prof")
+        return [PYTHON_EXECUTABLE, "-m", "cProfile", "-o", profile_file, "-m", module, *args]
+    return [PYTHON_EXECUTABLE, "-m", module, *args]
+
+@contextlib.contextmanager
+def captured_output():
+    # Stage output is captured, like the subprocess pipeline does with capture_output
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        yield buffer
+
+@contextlib.contextmanager
+def relayed_stderr():
+    # the generator's warnings still reach stderr, and are kept to go in the cache with the story
+    buffer = io.StringIO()
+    try:
+        with contextlib.redirect_stderr(buffer):
+            yield buffer
+    finally:
+        sys.stderr.write(buffer.getvalue())
+
+# The stages, each with its cache stage name and the option labels in its cache key. Every
+# key hashes the program source, so a stage is looked up without the artifacts before it.
+CACHE_STAGES = ("tokens", "ast", "story")
+
+def cache_labels(options):
+    # the scanner is in every label: the stages after it are keyed on the source, not its tokens
+    return [(options.scanner, options.token_format),
+            (options.scanner, options.token_format, options.ast_format, options.max_errors),
+            (options.scanner, options.token_format, options.max_errors)]
+
+def plan_stages(cache, input_file, artifact_files, options):
+    """Decide which stages to run for the artifacts wanted.
+
+    artifact_files are the tokens, AST and story files, None for an artifact
+    not to write. Returns (keys, runs, hits): the cache key of each stage, whether
+    it has to run, and the cached bytes of each wanted artifact the cache has. A
+    stage runs when its artifact is wanted but not cached, or when the next stage
+    runs and can't read that artifact from a file instead.
+    """
+    keys = [None] * 3
+    hits = [None] * 3
+    runs = [False] * 3
+    labels = cache_labels(options)
+    for index in reversed(range(3)):
+        if cache is not None:
+            keys[index] = cache.key(CACHE_STAGES[index], [input_file], *labels[index])
+            if artifact_files[index] is not None:
+                hits[index] = cache.get(keys[index])
+        feeds_next = index < 2 and runs[index + 1] and hits[index] is None
+        runs[index] = (artifact_files[index] is not None and hits[index] is None) or feeds_next
+    return keys, runs, hits
+
+def run_stage(cache, key, hit, output_file, produce):
+    """Write output_file from the cached bytes hit, or run produce() and cache what it wrote.
+
+    Returns True when output_file was served from the cache. produce() may
+    leave output_file None, for an artifact only handed to the next stage.
+    It returns the warnings the stage printed, if any: they are cached with
+    the artifact and printed again when it is served from the cache.
+    """
+    if hit is not None:
+        # an entry is the warnings (text, never a NUL), a NUL, then the artifact
+        warnings, _, artifact = hit.partition(b"\0")
+        sys.stderr.write(warnings.decode("utf-8"))
+        with open(output_file, "wb") as outfile:
+            outfile.write(artifact)
+        return True
+    warnings = produce() or ""
+    if cache is not None and output_file is not None:
+        with open(output_file, "rb") as infile:
+            cache.put(key, warnings.encode("utf-8") + b"\0" + infile.read())
+    return False
+
+def written_note(name, output_file, hit):
+    if output_file is None:
+        return f"{name} passed on (not written)"
+    return f"{name} written to: {output_file}{cached_note(hit)}"
+
+def cached_note(hit):
+    return " (from cache)" if hit else ""
+
+def profile_stage(profiler, name, subprocess=False, covers=()):
+    """profiler.stage(name), or a throwaway record when not profiling."""
+    if profiler is None:
+        return contextlib.nullcontext({})
+    return profiler.stage(name, subprocess, covers)
+
+def note_cache_hit(record, hit, output_file):
+    if hit:
+        record["cached"] = True
+        record["bytes_read"] = record["bytes_written"] = os.path.getsize(output_file)
+
+def run_in_process(input_file, tokens_file, ast_file, story_output_file, options, cache=None, profiler=None):
+    """Run the stages in this interpreter, passing tokens and the AST as objects.
+
+    A file left None is an artifact not to write; see plan_stages() for the stages that run.
+    """
+    from . import stage_profile
+    # Stage results handed to the next stage; a stage served from the cache leaves none,
+    # and the next stage reads the artifact file instead
+    results = {}
+
+    def scan(record):
+        from . import my_scanner
+        with captured_output():
+            scanner = my_scanner.SCANNERS[options.scanner](input_file)
+            tokens = results["tokens"] = scanner.scan_columnar()
+            if tokens_file is not None:
+                my_scanner.write_tokens(tokens, tokens_file, options.token_format)
+        record.update(
+            tokens=len(tokens), errors=stage_profile.count_error_tokens(tokens),
+            bytes_read=stage_profile.file_size(input_file), bytes_written=stage_profile.file_size(tokens_file),
+        )
+
+    def parse(record):
+        from . import my_parser
+        with captured_output():
+            if "tokens" in results:
+                tokens = my_parser.tokens_from_scanner(results["tokens"], options.token_format)
+            else:
+                tokens = my_parser.read_tokens(tokens_file)
+                record["bytes_read"] = stage_profile.file_size(tokens_file)
+            parser = my_parser.Parser(tokens, options.max_errors)
+            results["ast"] = parser.parse()
+            if ast_file is not None:
+                my_parser.write_ast(results["ast"], ast_file, options.ast_format)
+        record.update(tokens=len(tokens), errors=len(parser.errors), bytes_written=stage_profile.file_size(ast_file))
+        if profiler is not None:
+            record["ast_nodes"] = stage_profile.count_nodes(results["ast"])
+
+    def generate(record):
+        from . import story_generator
+        with captured_output(), relayed_stderr() as warnings:
+            if "ast" in results:
+                ast = results["ast"]
+            else:
+                ast = story_generator.load_ast(ast_file)
+                record["bytes_read"] = stage_profile.file_size(ast_file)
+            story_generator.write_story_stream(story_generator.iter_output(ast), story_output_file)
+        record.update(errors=0, bytes_written=stage_profile.file_size(story_output_file))
+        return warnings.getvalue()
+
+    keys, runs, hits = plan_stages(cache, input_file, [tokens_file, ast_file, story_output_file], options)
+
+    if runs[0] or hits[0] is not None:
+        print("\n--- Running Scanner ---")
+        with profile_stage(profiler, "scan") as record:
+            hit = run_stage(cache, keys[0], hits[0], tokens_file, lambda: scan(record))
+            note_cache_hit(record, hit, tokens_file)
+        print(written_note("Tokens", tokens_file, hit))
+
+    if runs[1] or hits[1] is not None:
+        print("\n--- Running Parser ---")
+        with profile_stage(profiler, "parse") as record:
+            hit = run_stage(cache, keys[1], hits[1], ast_file, lambda: parse(record))
+            note_cache_hit(record, hit, ast_file)
+        print(written_note("AST", ast_file, hit))
+
+    if runs[2] or hits[2] is not None:
+        print("\n--- Running Story Generator ---")
+        with profile_stage(profiler, "generate") as record:
+            hit = run_stage(cache, keys[2], hits[2], story_output_file, lambda: generate(record))
+            note_cache_hit(record, hit, story_output_file)
+        print(written_note("Story output", story_output_file, hit))
+
+def run_isolated(input_file, output_folder, tokens_file, ast_file, story_output_file, options, cache=None, profiler=None):
+    """Run each stage as its own Python subprocess, handing off through the output files.
+
+    Tokens and an AST that are not to be written still go through files, in a
+    temporary directory, when a later stage reads them.
+    """
+    outputs = {}	# stage -> stdout of its subprocess
+
+    def run(stage, command):
+        outputs[stage], errors = run_command(command)
+        if stage == "generate":
+            return relay_warnings(errors)
+
+    keys, runs, hits = plan_stages(cache, input_file, [tokens_file, ast_file, story_output_file], options)
+    import tempfile
+    scratch = tempfile.TemporaryDirectory()
+    # the files the stages hand off through
+    tokens_path = tokens_file or os.path.join(scratch.name, TOKEN_FILES[options.token_format])
+    ast_path = ast_file or os.path.join(scratch.name, AST_FILES[options.ast_format])
+    records = {}
+
+    try:
+        # Step 2: Run the scanner
+        if runs[0] or hits[0] is not None:
+            print("\n--- Running Scanner ---")
+            scanner_command = stage_command(
+                profiler, output_folder, "scan", SCANNER_MODULE, input_file, "--output", tokens_path,
+                "--scanner", options.scanner, "--format", options.token_format
+            )
+            with profile_stage(profiler, "scan", subprocess=True) as records["scan"]:
+                hit = run_stage(cache, keys[0], hits[0], tokens_file, lambda: run("scan", scanner_command))
+                note_cache_hit(records["scan"], hit, tokens_file)
+            print(written_note("Tokens", tokens_file, hit))
+
+        # Step 3: Run the parser
+        if runs[1] or hits[1] is not None:
+            print("\n--- Running Parser ---")
+            parser_command = stage_command(profiler, output_folder, "parse", PARSER_MODULE, tokens_path,
+                                           "--output", ast_path, "--format", options.ast_format)
+            if options.max_errors:
+                parser_command += ["--max-errors", str(options.max_errors)]
+            with profile_stage(profiler, "parse", subprocess=True) as records["parse"]:
+                hit = run_stage(cache, keys[1], hits[1], ast_file, lambda: run("parse", parser_command))
+                note_cache_hit(records["parse"], hit, ast_file)
+            print(written_note("AST", ast_file, hit))
+
+        # Step 4: Run the story generator
+        if runs[2] or hits[2] is not None:
+            print("\n--- Running Story Generator ---")
+            # story_output_file = os.path.join(output_folder, "story_output.txt")
+            storygen_command = stage_command(profiler, output_folder, "generate", STORYGEN_MODULE, ast_path,
+                                             "--output", story_output_file)
+            with profile_stage(profiler, "generate", subprocess=True) as records["generate"]:
+                hit = run_stage(cache, keys[2], hits[2], story_output_file, lambda: run("generate", storygen_command))
+                note_cache_hit(records["generate"], hit, story_output_file)
+            print(written_note("Story output", story_output_file, hit))
+
+        if profiler is not None:
+            # the counts come from the artifacts, after the stages have been timed
+            from . import my_parser
+            from . import story_generator
+            from . import stage_profile
+            if "scan" in records or "parse" in records:
+                tokens = my_parser.read_tokens(tokens_path)
+            if "scan" in records:
+                records["scan"].update(tokens=len(tokens), errors=stage_profile.count_error_tokens(tokens))
+            if "parse" in records:
+                records["parse"].update(tokens=len(tokens), ast_nodes=stage_profile.count_nodes(story_generator.load_ast(ast_path)))
+                if "parse" in outputs:
+                    # my_parser.py prints one "Error: ..." line per parse error
+                    records["parse"]["errors"] = sum(1 for line in outputs["parse"].splitlines() if line.startswith("Error: "))
+            if "generate" in records:
+                records["generate"]["errors"] = 0
+            for stage, read, written in [("scan", input_file, tokens_file),
+                                         ("parse", tokens_path, ast_file),
+                                         ("generate", ast_path, story_output_file)]:
+                if stage in records and not records[stage]["cached"]:
+                    records[stage].update(bytes_read=stage_profile.file_size(read),
+                                          bytes_written=stage_profile.file_size(written))
+    finally:
+        scratch.cleanup()
+
+def run_pipelined(input_file, output_folder, tokens_file, ast_file, story_output_file, options, profiler=None):
+    """Run the stages as concurrent subprocesses joined by pipes.
+
+    Tokens flow into the parser and AST blocks towards the generator while the
+    upstream stages are still working. Only the stages up to the last artifact
+    to write are started; the tokens and AST files that are to be written get a
+    copy of what goes through the pipes.
+    """
+    import asyncio
+    files = [tokens_file, ast_file, story_output_file]
+    last = max(index for index, output_file in enumerate(files) if output_file is not None)
+    commands = [
+        stage_command(profiler, output_folder, "scan", SCANNER_MODULE, input_file, "--stream",
+                      "--scanner", options.scanner, "--format", options.token_format),
+        stage_command(profiler, output_folder, "parse", PARSER_MODULE, "-", "--format", options.ast_format),
+        stage_command(profiler, output_folder, "generate", STORYGEN_MODULE, "-"),
+    ][:last + 1]
+    if options.max_errors and last >= 1:
+        commands[1] += ["--max-errors", str(options.max_errors)]
+    # every stage writes to the pipe, except the last one started
+    for index, command in enumerate(commands):
+        command += ["--output", files[index] if index == last else "-"]
+
+    titles = ["Scanner", "Parser", "Story Generator"][:last + 1]
+    print(f"\n--- Running {', '.join(titles[:-1])}{' and ' if last else ''}{titles[-1]} ---")
+    with profile_stage(profiler, "pipeline", subprocess=True, covers=("scan", "parse", "generate")[:last + 1]) as record:
+        stage_outputs = asyncio.run(run_pipe(commands, files[:last]))
+    if last == 2:
+        relay_warnings(stage_outputs[2])
+    for name, written in [("Tokens", tokens_file), ("AST", ast_file), ("Story output", story_output_file)][:last + 1]:
+        if written is not None:
+            print(f"{name} written to: {written}")
+
+    if profiler is not None:
+        from . import stage_profile
+        # my_parser.py prints one "Error: ..." line per parse error
+        errors = 0 if last == 0 else sum(1 for line in stage_outputs[1].splitlines() if line.startswith("Error: "))
+        record.update(errors=errors, bytes_read=stage_profile.file_size(input_file),
+                      bytes_written=sum(stage_profile.file_size(output_file) for output_file in files))
+
+async def run_pipe(commands, tee_files):
+    """Run commands with each one's stdout piped into the next one's stdin.
+
+    The bytes between commands[i] and commands[i + 1] are also written to
+    tee_files[i] unless it is None. Returns the stderr output of each command,
+    and stdout of the last; a failing command raises CalledProcessError, or
+    SemanticError for a generator stopped by the program's errors, like
+    run_command.
+    """
+    import asyncio
+    processes = []
+    for index, command in enumerate(commands):
+        last = index == len(commands) - 1
+        processes.append(await asyncio.create_subprocess_exec(
+            *command,
+            env=stage_env(),
+            stdin=asyncio.subprocess.PIPE if index else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT if last else asyncio.subprocess.PIPE,
+        ))
+
+    async def pump(source, target, tee_file):
+        tee = open(tee_file, "wb") if tee_file is not None else None
+        try:
+            while True:
+                data = await source.read(PIPE_CHUNK)
+                if not data:
+                    break
+                if tee is not None:
+                    tee.write(data)
+                if target is not None:
+                    try:
+                        target.write(data)
+                        await target.drain()
+                    except (BrokenPipeError, ConnectionResetError):
+                        # the next stage died; keep reading so this one can finish, and report it below
+                        target = None
+        finally:
+            if tee is not None:
+                tee.close()
+            if target is not None:
+                target.close()
+
+    async def read_all(stream):
+        return (await stream.read()).decode(errors="replace")
+
+    try:
+        tasks = [pump(process.stdout, following.stdin, tee_file)
+                 for process, following, tee_file in zip(processes, processes[1:], tee_files)]
+        readers = [read_all(process.stderr) for process in processes[:-1]] + [read_all(processes[-1].stdout)]
+        outputs = (await asyncio.gather(*tasks, *readers))[len(tasks):]
+        for process in processes:
+            await process.wait()
+    except BaseException:
+        for process in processes:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        raise
+
+    for command, process, output in zip(commands, processes, outputs):
+        if process.returncode == SEMANTIC_ERROR_STATUS:
+            raise SemanticError.from_output(output)
+        if process.returncode:
+            import subprocess
+            print(f"Error running command: {' '.join(command)}")
+            print(f"Error output: {output}")
+            print(f"Return code: {process.returncode}")
+            raise subprocess.CalledProcessError(process.returncode, command, stderr=output)
+    return outputs
+
+def run_incremental(input_file, output_folder, tokens_file, ast_file, story_output_file, options, profiler=None,
+                    compilers=None):
+    """Run the pipeline in-process, redoing only the blocks that changed since the last run.
+
+    compilers maps state files to compilers kept in memory between runs (see
+    watch()); the state is only read from disk for a state file not in it.
+    """
+    from . import compile_cache
+    from . import incremental
+    from . import my_scanner
+    from . import my_parser
+    from . import story_generator
+    from . import stage_profile
+    state_file = os.path.join(output_folder, INCREMENTAL_STATE)
+    compiler_hash = compile_cache.source_hash(compiler_sources())
+    compiler = compilers.get(state_file) if compilers is not None else None
+    if compiler is None or compiler.token_format != options.token_format:
+        compiler = incremental.IncrementalCompiler.load(state_file, options.token_format, compiler_hash)
+        if compilers is not None:
+            compilers[state_file] = compiler
+    parse = ast_file is not None or story_output_file is not None
+
+    try:
+        # scanning and parsing are interleaved per block, so they are profiled as one stage
+        with profile_stage(profiler, "scan_parse" if parse else "scan", covers=("scan", "parse")) as record:
+            with open(input_file, 'r') as infile:
+                source = infile.read()
+            with captured_output():
+                if parse:
+                    tokens, ast, errors = compiler.compile(source, options.max_errors)
+                else:
+                    tokens, ast, errors = compiler.scan(source)[1], None, []
+            stats = compiler.stats
+
+            print("\n--- Running Scanner ---")
+            if tokens_file is not None:
+                my_scanner.write_tokens(tokens, tokens_file, options.token_format)
+            print(f"{written_note('Tokens', tokens_file, False)} "
+                  f"({stats['segments_scanned']}/{stats['segments']} segments rescanned)")
+
+            if parse:
+                print("\n--- Running Parser ---")
+                if ast_file is not None:
+                    my_parser.write_ast(ast, ast_file, options.ast_format)
+                print(f"{written_note('AST', ast_file, False)} ({stats['units_parsed']}/{stats['units']} units reparsed)")
+        record.update(
+            tokens=len(tokens), errors=stage_profile.count_error_tokens(tokens) + len(errors),
+            bytes_read=stage_profile.file_size(input_file),
+            bytes_written=stage_profile.file_size(tokens_file) + stage_profile.file_size(ast_file),
+        )
+        if profiler is not None and parse:
+            record["ast_nodes"] = stage_profile.count_nodes(ast)
+
+        if story_output_file is not None:
+            print("\n--- Running Story Generator ---")
+            with profile_stage(profiler, "generate") as record:
+                with captured_output():
+                    story_generator.write_story(compiler.render(ast), story_output_file)
+                record.update(errors=0, bytes_written=stage_profile.file_size(story_output_file))
+            print(f"Story output written to: {story_output_file} ({stats['scenes_rendered']} scenes rendered)")
+    finally:
+        compiler.save(state_file, compiler_hash)
+
+def run_parallel(input_file, output_folder, tokens_file, ast_file, story_output_file, options, profiler=None):
+    """Run the pipeline in-process, scanning and parsing chunks of the program on --jobs cores."""
+    from . import my_scanner
+    from . import my_parser
+    from . import parallel
+    from . import story_generator
+    from . import stage_profile
+    parse = ast_file is not None or story_output_file is not None
+
+    # each worker scans and parses its chunk in one go, so they are profiled as one stage
+    with profile_stage(profiler, "scan_parse" if parse else "scan", covers=("scan", "parse")) as record:
+        with captured_output():
+            if parse:
+                with open(input_file, 'r') as infile:
+                    source = infile.read()
+                tokens, ast, errors = parallel.compile_source(source, options.jobs, options.token_format, options.max_errors)
+            else:
+                # without a parse there is nothing to split up: scanning is one fast pass
+                tokens, ast, errors = my_scanner.RegexScanner(input_file).scan_columnar(), None, []
+
+        print("\n--- Running Scanner ---")
+        if tokens_file is not None:
+            my_scanner.write_tokens(tokens, tokens_file, options.token_format)
+        print(written_note("Tokens", tokens_file, False))
+
+        if parse:
+            print("\n--- Running Parser ---")
+            if ast_file is not None:
+                my_parser.write_ast(ast, ast_file, options.ast_format)
+            print(written_note("AST", ast_file, False))
+    record.update(
+        tokens=len(tokens), errors=stage_profile.count_error_tokens(tokens) + len(errors),
+        bytes_read=stage_profile.file_size(input_file),
+        bytes_written=stage_profile.file_size(tokens_file) + stage_profile.file_size(ast_file),
+    )
+    if profiler is not None and parse:
+        record["ast_nodes"] = stage_profile.count_nodes(ast)
+
+    if story_output_file is not None:
+        print("\n--- Running Story Generator ---")
+        with profile_stage(profiler, "generate") as record:
+            with captured_output():
+                story_generator.write_story_stream(story_generator.iter_output(ast), story_output_file)
+            record.update(errors=0, bytes_written=stage_profile.file_size(story_output_file))
+        print(f"Story output written to: {story_output_file}")
+
+def compiler_sources():
+    """The files whose contents decide what the compiler produces."""
+    return glob.glob(os.path.join(PACKAGE_DIR, "*.py"))
+
+def open_cache(options):
+    """Return the CompileCache for these options, or None with --no-cache."""
+    if options.no_cache:
+        return None
+    from . import compile_cache
+    return compile_cache.CompileCache(
+        options.cache_dir or compile_cache.DEFAULT_CACHE_DIR,
+        int(options.cache_size * 1024 * 1024),
+        compile_cache.source_hash(compiler_sources()),
+    )
+
+def compile_program(input_file, output_folder, options=None, compilers=None):
+    """Compile one program into output_folder and return the folder's absolute path.
+
+    options holds the pipeline flags parsed by build_arg_parser(); see default_options().
+    compilers is passed on to run_incremental(). With --stdout, output_folder
+    may be None, and the artifact goes to sys.stdout as it is when this is called.
+    """
+    if options is None:
+        options = default_options()
+
+    # Validate input file exists
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"Input file not found: {input_file}")
+
+    with contextlib.ExitStack() as stack:
+        stdout_dir = None
+        if options.stdout:
+            # the artifact is written to a temporary file and copied to stdout at the end;
+            # everything printed along the way goes to stderr
+            import tempfile
+            artifact_output = sys.stdout
+            stdout_dir = stack.enter_context(tempfile.TemporaryDirectory())
+            stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+            output_folder = output_folder or stdout_dir
+
+        # Step 1: Set up the output directory
+        output_folder = os.path.abspath(output_folder)
+        os.makedirs(output_folder, exist_ok=True)
+        if output_folder != stdout_dir:
+            print(f"All outputs will be stored in: {output_folder}")
+
+        # File paths for the artifacts to --emit; None for the others
+        file_names = {"tokens": TOKEN_FILES[options.token_format], "ast": AST_FILES[options.ast_format], "story": "story.txt"}
+        tokens_file, ast_file, story_output_file = [
+            os.path.join(stdout_dir or output_folder, file_names[artifact]) if artifact in options.emit else None
+            for artifact in ARTIFACTS
+        ]
+
+        profiler = None
+        if options.profile or options.profile_stage:
+            from . import stage_profile
+            profiler = stage_profile.StageProfiler(options.profile_stage)
+
+        try:
+            if options.incremental:
+                run_incremental(input_file, output_folder, tokens_file, ast_file, story_output_file, options,
+                                profiler, compilers)
+            elif options.parallel:
+                run_parallel(input_file, output_folder, tokens_file, ast_file, story_output_file, options, profiler)
+            elif options.pipeline:
+                run_pipelined(input_file, output_folder, tokens_file, ast_file, story_output_file, options, profiler)
+            elif options.isolated:
+                run_isolated(input_file, output_folder, tokens_file, ast_file, story_output_file, options,
+                             open_cache(options), profiler)
+            else:
+                run_in_process(input_file, tokens_file, ast_file, story_output_file, options, open_cache(options), profiler)
+        finally:
+            if profiler is not None:
+                mode = ("incremental" if options.incremental else "parallel" if options.parallel
+                        else "pipeline" if options.pipeline else "isolated" if options.isolated else "in-process")
+                profile_file = profiler.write(output_folder, input_file=os.path.abspath(input_file), mode=mode)
+                print(f"\nProfile written to: {profile_file}")
+
+        # Final message
+        print("\n--- Pipeline Complete ---")
+        if output_folder != stdout_dir:
+            print(f"Written to '{output_folder}' :")
+        for name, output_file in [("Tokens", tokens_file), ("AST", ast_file), ("Story", story_output_file)]:
+            if output_file is None:
+                output_file = "(not written)"
+            elif stdout_dir is not None:
+                output_file = "(stdout)"
+            print(f"- {name}: {output_file}")
+        print("Enjoy :)")
+
+        if stdout_dir is not None:
+            with open(next(filter(None, [tokens_file, ast_file, story_output_file])), "rb") as infile:
+                data = infile.read()
+            if hasattr(artifact_output, "buffer"):
+                artifact_output.flush()
+                artifact_output.buffer.write(data)
+                artifact_output.buffer.flush()
+            else:
+                # eg. the StringIO of a compile server request
+                artifact_output.write(data.decode("utf-8", "replace"))
+            if output_folder == stdout_dir:
+                return None
+    return output_folder
+
+# batch compilation
+def collect_batch(source, output_root):
+    """Expand a directory, glob or manifest into (input_file, output_folder) pairs.
+
+    A manifest lists one program per line, optionally followed by its output
+    folder name (the same "input output" layout run_ArtLang.sh uses).
+    """
+    entries = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            if os.path.isfile(path) and name.endswith(".txt"):
+                entries.append((path, None))
+    elif glob.has_magic(source):
+        entries = [(path, None) for path in sorted(glob.glob(source)) if os.path.isfile(path)]
+    else:
+        with open(source, 'r') as manifest:
+            for line in manifest:
+                parts = line.split()
+                if not parts or parts[0].startswith('#'):
+                    continue
+                entries.append((parts[0], parts[1] if len(parts) > 1 else None))
+
+    jobs = []
+    seen = set()
+    for input_file, folder_name in entries:
+        if folder_name is None:
+            folder_name = os.path.splitext(os.path.basename(input_file))[0]
+        if folder_name in seen:
+            raise ValueError(f"Two programs in the batch share the output folder '{folder_name}'")
+        seen.add(folder_name)
+        jobs.append((input_file, os.path.join(output_root, folder_name)))
+    return jobs
+
+def compile_batch_entry(input_file, output_folder, options):
+    """Worker entry point: compile one program and report status and timing."""
+    start = time.perf_counter()
+    try:
+        with captured_output():
+            compile_program(input_file, output_folder, options)
+        status, error = "ok", None
+    except Exception as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+    return {
+        "input_file": input_file,
+        "output_folder": os.path.abspath(output_folder),
+        "status": status,
+        "error": error,
+        "seconds": round(time.perf_counter() - start, 6),
+    }
+
+def run_batch(source, output_root, options=None):
+    """Compile every program in source across a pool of worker processes."""
+    if options is None:
+        options = default_options()
+    batch = collect_batch(source, output_root)
+    os.makedirs(output_root, exist_ok=True)
+    print(f"Compiling {len(batch)} programs into: {os.path.abspath(output_root)}")
+
+    start = time.perf_counter()
+    import concurrent.futures
+    with concurrent.futures.ProcessPoolExecutor(max_workers=options.jobs) as pool:
+        futures = [
+            pool.submit(compile_batch_entry, input_file, output_folder, options)
+            for input_file, output_folder in batch
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        line = f"{result['status']:<7} {result['seconds']:>9.3f}s  {result['input_file']}"
+        if result["error"]:
+            line += f"  ({result['error']})"
+        print(line)
+
+    failed = sum(1 for result in results if result["status"] != "ok")
+    summary = {
+        "programs": len(results),
+        "failed": failed,
+        "seconds": round(elapsed, 6),
+        "results": results,
+    }
+    import json
+    summary_file = os.path.join(output_root, "batch_summary.json")
+    with open(summary_file, "w") as outfile:
+        json.dump(summary, outfile, indent=4)
+
+    print(f"\n{len(results) - failed}/{len(results)} programs compiled in {elapsed:.3f}s")
+    print(f"Summary written to: {summary_file}")
+    return summary
+
+# watch mode
+def file_signature(path):
+    """What a poll compares to tell that a file changed, or None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def watch_entries(source, output_root, batch):
+    """The (input_file, output_folder) pairs to watch: one program, or with --batch everything collect_batch() finds."""
+    if batch:
+        return collect_batch(source, output_root)
+    return [(source, output_root)]
+
+def watch(source, output_root, options):
+    """Recompile programs whenever they change, until interrupted.
+
+    Files are polled with os.stat every WATCH_INTERVAL seconds; with --batch
+    the directory, glob or manifest is expanded again on every poll, so new
+    programs are picked up too. A program is recompiled once it has stayed
+    unchanged for WATCH_SETTLE seconds, incrementally, in this process, with
+    its compiler state kept in memory.
+    """
+    # import the compiler once; every rebuild reuses the loaded modules
+    from . import incremental
+    compilers = {}	# state file -> IncrementalCompiler
+    compiled = {}	# input file -> file_signature() it was last compiled at
+    pending = {}	# input file -> (signature, output folder) of a change not compiled yet
+    last_change = 0
+    entries_error = None
+    print(f"Watching {os.path.abspath(source)} (Ctrl-C to stop)")
+    try:
+        while True:
+            try:
+                entries = watch_entries(source, output_root, options.batch)
+                entries_error = None
+            except (OSError, ValueError) as e:
+                # eg. the manifest is being rewritten; keep the last good list
+                if str(e) != entries_error:
+                    entries_error = str(e)
+                    print(f"Error: {e}")
+                entries = [(input_file, folder) for input_file, (_, folder) in pending.items()]
+            for input_file, output_folder in entries:
+                signature = file_signature(input_file)
+                if signature is None:
+                    compiled.pop(input_file, None)	# compile it again if it comes back
+                    pending.pop(input_file, None)
+                elif signature != compiled.get(input_file):
+                    if input_file not in pending or pending[input_file][0] != signature:
+                        last_change = time.monotonic()
+                    pending[input_file] = (signature, output_folder)
+
+            if pending and time.monotonic() - last_change >= WATCH_SETTLE:
+                for input_file, (signature, output_folder) in pending.items():
+                    start = time.perf_counter()
+                    try:
+                        compile_program(input_file, output_folder, options, compilers)
+                    except SemanticError as e:
+                        print(e)
+                        status = "failed"
+                    except Exception as e:
+                        print(f"Error: {type(e).__name__}: {e}")
+                        status = "failed"
+                    else:
+                        status = "compiled"
+                    compiled[input_file] = signature
+                    print(f"[{time.strftime('%H:%M:%S')}] {status} {input_file} "
+                          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+                pending.clear()
+                print(f"Watching {os.path.abspath(source)} (Ctrl-C to stop)")
+            time.sleep(WATCH_INTERVAL)
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+
+def parse_emit(value):
+    """The --emit artifacts, in stage order."""
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in ARTIFACTS]
+    if unknown or not names:
+        raise argparse.ArgumentTypeError(f"expected a comma-separated list of {', '.join(ARTIFACTS)}, got '{value}'")
+    return tuple(artifact for artifact in ARTIFACTS if artifact in names)
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Addison compilation pipeline")
+    # input_file and --output_folder are required, except with --serve (checked in main)
+    parser.add_argument(
+        "input_file", nargs="?",
+        help="Path to the program input file (with --batch: a directory, glob or manifest)"
+    )
+    parser.add_argument(
+        "--output_folder", "-o",
+        help="Folder name to store all intermediary and output files"
+    )
+    parser.add_argument(
+        "--isolated", action="store_true",
+        help="Run each stage in its own Python subprocess instead of in-process"
+    )
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="Compile many programs, each into its own subfolder of the output folder"
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=None,
+        help="Number of worker processes for --batch or --parallel (default: one per CPU)"
+    )
+    parser.add_argument(
+        "--scanner", choices=["regex", "legacy"], default="regex",
+        help="Scanner backend: 'regex' (default) or the per-character 'legacy' scanner"
+    )
+    parser.add_argument(
+        "--token-format", choices=sorted(TOKEN_FILES), default="binary",
+        help="Token file format: typed 'binary' stream (tokens.bin, default) or repr 'text' lines (tokens.txt) for debugging"
+    )
+    parser.add_argument(
+        "--max-errors", type=int, default=None,
+        help="Stop parsing a program after this many errors (default: no limit)"
+    )
+    parser.add_argument(
+        "--ast-format", choices=list(AST_FILES), default="json",
+        help="AST file format: indented 'json' (default), 'compact' one-block-per-line json, or 'binary' (ast.bin); "
+             "compact and binary ASTs are loaded a block at a time"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Record time, memory, counts and I/O for each stage in profile.json in the output folder"
+    )
+    parser.add_argument(
+        "--profile-stage", choices=["scan", "parse", "generate"],
+        help="Also run this stage under cProfile and save the stats as <stage>.prof (implies --profile)"
+    )
+    parser.add_argument(
+        "--serve", action="store_true",
+        help="Run a compile server on a Unix socket for artlang_client.py, keeping the compiler loaded"
+    )
+    parser.add_argument(
+        "--socket",
+        help="Socket path for --serve (default: $ARTLANG_SOCKET or artlang-<uid>.sock in the temp directory)"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Keep the compiler state in the output folder and on the next run only rescan, "
+             "reparse and re-render the blocks that changed (in-process, regex scanner, no compile cache)"
+    )
+    parser.add_argument(
+        "--parallel", action="store_true",
+        help="Scan and parse chunks of one large program in --jobs worker processes "
+             "(in-process, regex scanner, no compile cache)"
+    )
+    parser.add_argument(
+        "--pipeline", action="store_true",
+        help="Run the three stages at once as subprocesses joined by pipes, each starting on "
+             "its input as it arrives (no compile cache)"
+    )
+    parser.add_argument(
+        "--no-intermediates", action="store_true",
+        help="With --pipeline, don't write the tokens and AST files (the same as --emit story)"
+    )
+    parser.add_argument(
+        "--emit", type=parse_emit, default=None,
+        help="Comma-separated artifacts to write: tokens, ast, story (default: all three, or story with "
+             "--stdout); stages no artifact needs are skipped"
+    )
+    parser.add_argument(
+        "--stdout", action="store_true",
+        help="Write the one artifact picked with --emit to stdout instead of the output folder "
+             "(progress messages go to stderr; --output_folder becomes optional)"
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Keep running and recompile the program (with --batch: each program) incrementally "
+             "whenever it changes"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Always run every stage instead of reusing cached tokens, AST and story"
+    )
+    parser.add_argument(
+        "--cache-dir", default=os.environ.get("ARTLANG_CACHE_DIR"),
+        help="Compile cache location (default: $ARTLANG_CACHE_DIR or ~/.cache/artlang)"
+    )
+    parser.add_argument(
+        "--cache-size", type=float, default=512,
+        help="Compile cache size cap in MB; least recently used entries are evicted (default: 512)"
+    )
+    return parser
+
+def default_options(**overrides):
+    """Pipeline options as the command line would set them by default."""
+    options = build_arg_parser().parse_args(["-", "--output_folder", "-"])
+    options.emit = ARTIFACTS	# what main() makes of no --emit
+    for name, value in overrides.items():
+        setattr(options, name, value)
+    return options
+
+def main(argv=None, source=None):
+    """Run the command line argv (default: sys.argv).
+
+    source is program text sent by artlang_client.py; it is compiled in place
+    of an input file named "-".
+    """
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args(argv)
+    if args.serve:
+        from .server import default_socket_path, serve
+        serve(args.socket or default_socket_path())
+        return
+    if args.emit is None:
+        args.emit = ("story",) if args.stdout or args.no_intermediates else ARTIFACTS
+    missing = [name for name, value in [("input_file", args.input_file), ("--output_folder/-o", args.output_folder)]
+               if value is None and not (args.stdout and name != "input_file")]
+    if missing:
+        arg_parser.error(f"the following arguments are required: {', '.join(missing)}")
+    if args.incremental and args.isolated:
+        arg_parser.error("--incremental runs in-process and cannot be combined with --isolated")
+    if args.parallel and (args.isolated or args.incremental or args.batch):
+        arg_parser.error("--parallel cannot be combined with --isolated, --incremental or --batch")
+    if args.pipeline and (args.isolated or args.incremental or args.parallel):
+        arg_parser.error("--pipeline cannot be combined with --isolated, --incremental or --parallel")
+    if args.no_intermediates and not args.pipeline:
+        arg_parser.error("--no-intermediates requires --pipeline")
+    if args.stdout:
+        if len(args.emit) != 1:
+            arg_parser.error("--stdout writes one artifact: pick it with --emit")
+        if args.batch or args.watch:
+            arg_parser.error("--stdout cannot be combined with --batch or --watch")
+        if (args.profile or args.profile_stage or args.incremental) and args.output_folder is None:
+            arg_parser.error("--stdout with --profile or --incremental needs --output_folder for their files")
+    if args.watch:
+        if args.isolated or args.parallel or args.pipeline:
+            arg_parser.error("--watch compiles incrementally and cannot be combined with --isolated, --parallel or --pipeline")
+        args.incremental = True
+
+    source_file = None
+    if source is not None and args.input_file == "-":
+        import tempfile
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as source_file:
+            source_file.write(source)
+        args.input_file = source_file.name
+
+    try:
+        if args.watch:
+            watch(args.input_file, args.output_folder, args)
+        elif args.batch:
+            summary = run_batch(args.input_file, args.output_folder, args)
+            if summary["failed"]:
+                sys.exit(1)
+        else:
+            compile_program(args.input_file, args.output_folder, args)
+    except SemanticError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if source_file is not None:
+            os.remove(source_file.name)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Content-addressed cache of compiled artifacts (tokens, AST, story).
+
+Each entry is keyed on a hash of the stage's input bytes plus a hash of the
+compiler's own sources, so editing the compiler invalidates everything it built.
+Entries are plain files under <cache_dir>/<key[:2]>/<key>; a hit refreshes the
+entry's mtime, and once the cache grows past its size cap the least recently
+used entries are removed.
+"""
+import hashlib
+import os
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "artlang")
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024	# bytes
+EVICT_TO = 0.9	# fraction of the cap to shrink to once it is exceeded
+
+READ_BLOCK = 1 << 20
+
+def hash_file(digest, file_path):
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(READ_BLOCK), b''):
+            digest.update(block)
+
+def source_hash(paths):
+    """Hash the contents of the given compiler source files."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode('utf-8') + b'\0')
+        hash_file(digest, path)
+    return digest.hexdigest()
+
+class CompileCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE, compiler_hash=''):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.compiler_hash = compiler_hash
+        self.size = None	# bytes in the cache, counted on the first put()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, stage, input_files, *labels):
+        """Return the key for a stage run over input_files with the given option labels."""
+        digest = hashlib.sha256()
+        for part in (self.compiler_hash, stage, *labels):
+            digest.update(str(part).encode('utf-8') + b'\0')
+        for path in input_files:
+            hash_file(digest, path)
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key):
+        """Return the cached bytes for key, or None on a miss."""
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)	# mark as recently used
+        except FileNotFoundError:
+            pass	# evicted by another process in the meantime
+        return data
+
+    def put(self, key, data):
+        import tempfile	# only needed on a miss
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.entries())
+        else:
+            self.size += len(data)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        """Yield (path, size, mtime) for every entry in the cache."""
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith('.tmp-'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        """Remove least recently used entries until the cache is back under its cap."""
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        self.size = sum(size for _, size, _ in entries)
+        # leave some headroom so the next few puts don't each trigger a full scan
+        target = self.max_bytes * EVICT_TO
+        for path, size, _ in entries:
+            if self.size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
@@ -0,0 +1,91 @@
+"""Structured parser and semantic diagnostics.
+
+The parser records a Diagnostic per error: a code, the token it is about and
+its source position. Semantic analysis (semantics.py) records one per name it
+can't resolve, with the names in detail and no position. The message is only
+formatted when the diagnostic is printed, so inputs with thousands of errors
+don't pay for text nobody reads. str(diagnostic) is the message alone;
+format() adds the position when known.
+"""
+
+# Message templates by diagnostic code; {token} is the (type, value) tuple
+MESSAGES = {
+    "expected-token": "Expected {expected} but found {token}",
+    "missing-equals": "Missing '=' after {expected}",
+    "invalid-evil": "Missing or invalid value for 'evil' after '=', assigned default 'False'",
+    "invalid-strength": "Missing or invalid value for 'strength' after '=', assigned default '0'",
+    "unexpected-token": "Unexpected token: {token}",
+    "unexpected-in-character-block": "Unexpected token in character block: {token}",
+    "unexpected-in-character-detail": "Unexpected token in character detail: {token}",
+    "unexpected-in-scene-block": "Unexpected token in scene block: {token}",
+    "unexpected-in-scene-definition": "Unexpected token in scene definition: {token}",
+    "unexpected-instruction": "Unexpected instruction: {token}",
+    "token-error": "Encountered TOK_ERROR: {token}",
+    "exception": "{detail}",
+    "too-many-errors": "Too many errors ({detail}), parsing stopped",
+    "undefined-character": "Character '{detail[0]}' in scene '{detail[1]}' is not defined",
+    "empty-scene": "Scene '{detail}' has a location but no characters",
+    "malformed-assignment": "Character '{detail}' has an assignment without '='",
+    "duplicate-character": "Character '{detail}' is defined more than once, the last definition is used",
+    "duplicate-scene": "Scene '{detail}' is defined more than once",
+    "unknown-printed-character": "Character '{detail}' in 'print characters' is not defined",
+}
+
+# Codes that are reported without stopping the compile
+WARNINGS = {"duplicate-character", "duplicate-scene", "unknown-printed-character"}
+
+# Exit status of a stage subprocess stopped by a SemanticError
+SEMANTIC_ERROR_STATUS = 3
+
+class TooManyErrors(Exception):
+    """Raised by the parser when it records its max_errors'th error."""
+
+class SemanticError(Exception):
+    """Raised before generation when semantic analysis finds errors; carries their diagnostics."""
+
+    def __init__(self, diagnostics):
+        self.diagnostics = diagnostics
+        super().__init__("\n".join(f"Error: {diagnostic.format()}" for diagnostic in diagnostics))
+
+    @classmethod
+    def from_output(cls, output):
+        """Rebuild the error a stage subprocess printed before exiting with SEMANTIC_ERROR_STATUS."""
+        prefix = "Error: "
+        return cls([Diagnostic("exception", detail=line[len(prefix):])
+                    for line in output.splitlines() if line.startswith(prefix)])
+
+class Diagnostic:
+    __slots__ = ('code', 'token', 'line', 'column', 'expected', 'detail')
+
+    def __init__(self, code, token=None, line=None, column=None, expected=None, detail=None):
+        self.code = code	# key of MESSAGES
+        self.token = token	# (type, value) of the token, or None at the end of input
+        self.line = line	# position of the token, None when unknown
+        self.column = column
+        self.expected = expected	# token type name, for expected-token and missing-equals
+        self.detail = detail
+
+    @property
+    def message(self):
+        return MESSAGES[self.code].format(token=self.token, expected=self.expected, detail=self.detail)
+
+    @property
+    def is_error(self):
+        return self.code not in WARNINGS
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f'<Diagnostic {self.code} at {self.line}:{self.column}>'
+
+    def format(self):
+        """The message, prefixed with its line and column when known."""
+        if self.line is None:
+            return self.message
+        return f"line {self.line}, column {self.column}: {self.message}"
+
+    def moved(self, line_offset):
+        """A copy with the line shifted by line_offset."""
+        line = None if self.line is None else self.line + line_offset
+        return Diagnostic(self.code, self.token, line, self.column, self.expected, self.detail)
@@ -0,0 +1,281 @@
+"""The ArtLang grammar, and the LL(1) table generator the parser is driven by.
+
+GRAMMAR is the one place the syntax is written down. Grammar(text) computes
+its nullable nonterminals and FIRST, FIRST2 (first two tokens) and FOLLOW
+sets, and predicts an alternative for each (nonterminal, token) pair. Where
+one token is not enough, eg. a scene name and a 'characters = ...' line both
+start with TOK_IDENTIFIER, the second token decides. When it cannot either, the
+alternative that does not derive ε wins: a list of identifiers takes every
+identifier that follows it. Any other conflict is a GrammarError.
+
+The parser does not walk the table symbol by symbol. Grammar.dispatch() flattens
+the table for one nonterminal into a tuple indexed by token code, whose entries
+are the parse method for the construct that token starts, or STOP, SKIP and
+ERROR for tokens that end the construct, are ignored or are reported.
+"""
+from .tokens import TOKEN_CODES, TOKEN_NAMES, T_NONE
+
+# Productions: 'ε' is the empty alternative, TOK_* names are tokens, and a quoted
+# word is a TOK_IDENTIFIER with that exact value
+GRAMMAR = r"""
+program               -> block program | ε
+block                 -> character_block | scene_block | instruction_block
+
+character_block       -> TOK_CHARACTERS character_list
+character_list        -> character character_list | ε
+character             -> TOK_IDENTIFIER character_definition
+character_definition  -> character_detail character_definition | ε
+character_detail      -> evil_assignment | strength_assignment | trait_list
+evil_assignment       -> TOK_EVIL TOK_EQUALS boolean
+strength_assignment   -> TOK_STRENGTH TOK_EQUALS TOK_NUMBER
+boolean               -> TOK_YES | TOK_NO
+trait_list            -> TOK_TRAIT TOK_EQUALS identifier_list
+
+scene_block           -> TOK_SCENES scene_list
+scene_list            -> scene scene_list | ε
+scene                 -> TOK_IDENTIFIER scene_definition
+scene_definition      -> scene_detail scene_definition | ε
+scene_detail          -> location_assignment | event_assignment | characters_present
+location_assignment   -> TOK_LOCATION TOK_EQUALS TOK_IDENTIFIER
+event_assignment      -> TOK_EVENT TOK_EQUALS TOK_IDENTIFIER
+characters_present    -> 'characters' TOK_EQUALS identifier_list
+
+instruction_block     -> TOK_WRITE_STORY_INST | TOK_PRINT_CHARACTERS_INST identifier_list
+identifier_list       -> TOK_IDENTIFIER identifier_list | TOK_COMMA identifier_list | ε
+"""
+
+EPSILON = 'ε'
+END = T_NONE	# end of input, in FOLLOW sets
+
+# Dispatch table entries that are not parse methods
+STOP = 'stop'	# the construct ends before this token
+SKIP = 'skip'	# the token is passed over silently
+ERROR = 'error'	# the token is reported and passed over
+
+class GrammarError(Exception):
+    pass
+
+class Lookahead:
+    """Dispatch entry decided by the token after the current one."""
+    __slots__ = ('by_next', 'default')
+
+    def __init__(self, by_next, default):
+        self.by_next = by_next	# next token code -> entry
+        self.default = default
+
+    def resolve(self, next_type):
+        return self.by_next.get(next_type, self.default)
+
+class Keyword:
+    """Dispatch entry for a construct starting with a TOK_IDENTIFIER of a given value."""
+    __slots__ = ('value', 'action')
+
+    def __init__(self, value, action):
+        self.value = value
+        self.action = action
+
+class Grammar:
+    def __init__(self, text=GRAMMAR):
+        self.rules = {}	# nonterminal -> list of alternatives (tuples of symbols)
+        self.keywords = {}	# quoted symbol -> identifier value
+        for line in text.strip().splitlines():
+            if not line.strip():
+                continue
+            name, _, body = line.partition('->')
+            self.rules[name.strip()] = [
+                () if alternative.split() == [EPSILON] else tuple(alternative.split())
+                for alternative in body.split('|')
+            ]
+        self.start = next(iter(self.rules))
+        for alternatives in self.rules.values():
+            for alternative in alternatives:
+                for symbol in alternative:
+                    self.check_symbol(symbol)
+
+        self.nullable = self.compute_nullable()
+        self.first = self.compute_first()
+        self.first2 = self.compute_first2()
+        self.follow = self.compute_follow()
+        self.table = self.compute_table()
+
+    def check_symbol(self, symbol):
+        if symbol in self.rules or symbol in TOKEN_CODES:
+            return
+        if len(symbol) > 2 and symbol[0] == symbol[-1] == "'":
+            self.keywords[symbol] = symbol[1:-1]
+            return
+        raise GrammarError(f"Unknown symbol '{symbol}'")
+
+    def code(self, symbol):
+        """Token code of a terminal symbol; a keyword is a TOK_IDENTIFIER."""
+        if symbol in self.keywords:
+            return TOKEN_CODES['TOK_IDENTIFIER']
+        return TOKEN_CODES[symbol]
+
+    def is_terminal(self, symbol):
+        return symbol not in self.rules
+
+    def compute_nullable(self):
+        nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for name, alternatives in self.rules.items():
+                if name not in nullable and any(all(symbol in nullable for symbol in alternative)
+                                                for alternative in alternatives):
+                    nullable.add(name)
+                    changed = True
+        return nullable
+
+    def compute_first(self):
+        first = {name: set() for name in self.rules}
+        changed = True
+        while changed:
+            changed = False
+            for name, alternatives in self.rules.items():
+                for alternative in alternatives:
+                    codes = self.first_of(alternative, first)
+                    if not codes <= first[name]:
+                        first[name] |= codes
+                        changed = True
+        return first
+
+    def first_of(self, symbols, first=None):
+        """Token codes that can start symbols (which may also derive ε)."""
+        first = self.first if first is None else first
+        codes = set()
+        for symbol in symbols:
+            if self.is_terminal(symbol):
+                codes.add(self.code(symbol))
+                break
+            codes |= first[symbol]
+            if symbol not in self.nullable:
+                break
+        return codes
+
+    def compute_first2(self):
+        # sets of token code tuples of length 2, or shorter when the input may end there
+        first2 = {name: set() for name in self.rules}
+        changed = True
+        while changed:
+            changed = False
+            for name, alternatives in self.rules.items():
+                for alternative in alternatives:
+                    prefixes = self.first2_of(alternative, first2)
+                    if not prefixes <= first2[name]:
+                        first2[name] |= prefixes
+                        changed = True
+        return first2
+
+    def first2_of(self, symbols, first2=None):
+        first2 = self.first2 if first2 is None else first2
+        prefixes = {()}
+        for symbol in symbols:
+            if all(len(prefix) == 2 for prefix in prefixes):
+                break
+            extensions = {(self.code(symbol),)} if self.is_terminal(symbol) else first2[symbol]
+            prefixes = {prefix if len(prefix) == 2 else (prefix + extension)[:2]
+                        for prefix in prefixes for extension in extensions}
+        return prefixes
+
+    def compute_follow(self):
+        follow = {name: set() for name in self.rules}
+        follow[self.start].add(END)
+        changed = True
+        while changed:
+            changed = False
+            for name, alternatives in self.rules.items():
+                for alternative in alternatives:
+                    for index, symbol in enumerate(alternative):
+                        if self.is_terminal(symbol):
+                            continue
+                        rest = alternative[index + 1:]
+                        codes = self.first_of(rest)
+                        if all(other in self.nullable for other in rest):
+                            codes |= follow[name]
+                        if not codes <= follow[symbol]:
+                            follow[symbol] |= codes
+                            changed = True
+        return follow
+
+    def compute_table(self):
+        """nonterminal -> {token code: alternative index, or a Lookahead of them}"""
+        table = {}
+        for name, alternatives in self.rules.items():
+            predictions = {}	# token code -> indexes of the alternatives it predicts
+            for index, alternative in enumerate(alternatives):
+                codes = self.first_of(alternative)
+                if all(symbol in self.nullable for symbol in alternative):
+                    codes |= self.follow[name]
+                for code in codes:
+                    predictions.setdefault(code, []).append(index)
+            table[name] = {
+                code: indexes[0] if len(indexes) == 1 else self.resolve_conflict(name, code, indexes)
+                for code, indexes in predictions.items()
+            }
+        return table
+
+    def resolve_conflict(self, name, code, indexes):
+        """Choose between alternatives that code predicts, by the token after it if possible.
+
+        At most one of them may derive ε: it is chosen when no other alternative
+        matches the next token. If the next token cannot tell, the one alternative
+        that does not derive ε is always chosen.
+        """
+        alternatives = self.rules[name]
+        nullable = [index for index in indexes if all(symbol in self.nullable for symbol in alternatives[index])]
+        others = [index for index in indexes if index not in nullable]
+        if len(nullable) > 1:
+            raise GrammarError(f"{name}: more than one alternative derives ε")
+        by_next = {}
+        for index in others:
+            for prefix in self.first2_of(alternatives[index]):
+                if prefix[0] != code:
+                    continue
+                if len(prefix) < 2 and len(others) == 1:
+                    return index
+                if len(prefix) < 2 or by_next.get(prefix[1], index) != index:
+                    raise GrammarError(f"{name}: alternatives starting with "
+                                       f"{TOKEN_NAMES[code]} are not decided by the next token")
+                by_next[prefix[1]] = index
+        return Lookahead(by_next, nullable[0] if nullable else None)
+
+    def dispatch(self, name, actions, skip=(), errors=(), otherwise=ERROR):
+        """Flatten the table for nonterminal name into a tuple indexed by token code.
+
+        actions maps the nonterminals with a parse method to it: a token's entry is
+        the action of the first of them its prediction reaches. A prediction of ε
+        is STOP, unless the token is in errors; tokens in skip are SKIPped, and
+        any other token gets otherwise.
+        """
+        entries = [otherwise] * (max(TOKEN_NAMES) + 1)
+        for code, prediction in self.table[name].items():
+            entries[code] = self.action(name, prediction, code, actions)
+            if entries[code] is STOP and code in errors:
+                entries[code] = ERROR
+        for token in skip:
+            entries[TOKEN_CODES[token]] = SKIP
+        return tuple(entries)
+
+    def action(self, name, prediction, code, actions):
+        """The dispatch entry for a prediction of nonterminal name on token code."""
+        if isinstance(prediction, Lookahead):
+            return Lookahead(
+                {next_code: self.action(name, index, code, actions) for next_code, index in prediction.by_next.items()},
+                self.action(name, prediction.default, code, actions),
+            )
+        if prediction is None:
+            return STOP
+        alternative = self.rules[name][prediction]
+        if not alternative:
+            return STOP
+        symbol = alternative[0]
+        if symbol in actions:
+            # the construct's own first token may be a keyword
+            start = self.rules[symbol][self.table[symbol][code]]
+            if start and start[0] in self.keywords:
+                return Keyword(self.keywords[start[0]], actions[symbol])
+            return actions[symbol]
+        if self.is_terminal(symbol):
+            raise GrammarError(f"{name}: no action for {symbol}")
+        return self.action(symbol, self.table[symbol].get(code), code, actions)
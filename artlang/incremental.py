@@ -0,0 +1,420 @@
+"""Block-level incremental recompilation.
+
+An IncrementalCompiler remembers the previous compile and, given the edited
+source, only rescans, reparses and re-renders the pieces that changed. The
+tokens, AST, parser errors and story it returns are the same as a full
+rebuild's.
+
+    Scanning: the source is cut into segments at "header" lines (lines with no
+    '=', eg. "Characters", a character or scene name, an instruction). Every
+    segment starts at the beginning of a line, so its tokens only depend on its
+    own text; each segment is scanned on its own and cached by content hash.
+    Line numbers are relative to the segment and shifted when the segments are
+    joined. A segment whose last token could run on into the next one (eg.
+    "event =" right before a header line) is merged with it.
+
+    Parsing: the parser is resumed at segment boundaries. A unit of segments
+    is parsed from a loop head (top level, or between the entries of a
+    character or scene block) until the parser is back at a loop head exactly
+    on a later boundary. Its result only depends on its own tokens and the two
+    tokens after it, which the parser may look at before stopping, so it is
+    cached on those, with the lines of its diagnostics relative to its start.
+    Blocks spanning many units are put back together from the units' events.
+
+    Story: scenes are rendered through a memo that is dropped for a scene when
+    it was reparsed or one of its characters changed.
+"""
+import bisect
+import hashlib
+import marshal
+import re
+from .my_scanner import RegexScanner
+from .grammar import STOP, ERROR
+from .my_parser import (
+    Parser, tokens_from_scanner,
+    INSTRUCTION_TOKENS, CHARACTER_LIST, SCENE_LIST,
+)
+from .token_buffer import TokenBuffer
+from .diagnostics import Diagnostic
+from .tokens import T_NONE, T_ERROR, T_CHARACTERS, T_SCENES
+from .ast_nodes import CHARACTER_BLOCK, SCENE_BLOCK_LIST
+from .ast_store import MARSHAL_VERSION
+from . import story_generator
+from .story_generator import NAME
+
+# Bumped whenever the saved state layout changes
+STATE_VERSION = 5
+
+# Segments start at lines without '=' that are not blank: block keywords,
+# character and scene names, instructions
+SEGMENT_START = re.compile(r'^(?=[^\S\n]*[^\s=][^=\n]*$)', re.M)
+
+# Where a parse unit starts and stops: the loops of Parser.parse,
+# Parser.parse_character_block and Parser.parse_scene_block
+TOP, CHARACTER_ENTRIES, SCENE_ENTRIES = range(3)
+
+# Unit events, replayed in order to rebuild the top-level blocks
+OPEN_CHARACTERS = 'open_characters'
+OPEN_SCENES = 'open_scenes'
+ENTRY = 'entry'		# a character or scene appended to the open block
+CLOSE = 'close'		# the open block is complete
+ABORT = 'abort'		# an exception discarded the open block
+BLOCK = 'block'		# an instruction block
+
+class Segment:
+    __slots__ = ('tokens', 'errors', 'lines')
+
+    def __init__(self, tokens, errors, lines):
+        self.tokens = tokens	# TokenBuffer, line numbers relative to the segment
+        self.errors = errors	# indexes of TOK_ERROR tokens, whose messages carry a line number
+        self.lines = lines	# newlines in the segment's text
+
+class Unit:
+    __slots__ = ('span', 'mode', 'events', 'errors')
+
+    def __init__(self, span, mode, events, errors):
+        self.span = span	# number of segments parsed
+        self.mode = mode	# loop the parser stopped in
+        self.events = events
+        self.errors = errors	# diagnostics, lines relative to the unit's first line
+
+def relocate_error(message, line_offset):
+    """Shift the line number in a scanner error message."""
+    head, _, position = message.rpartition(" at line ")
+    line, _, column = position.partition(",")
+    return f"{head} at line {int(line) + line_offset},{column}"
+
+def has_error_between(errors_at, start, end):
+    """Whether the sorted TOK_ERROR indexes include one in [start, end)."""
+    return bisect.bisect_left(errors_at, end) > bisect.bisect_left(errors_at, start)
+
+def buffer_data(tokens):
+    """A TokenBuffer as marshal-able data."""
+    return (tokens.types.tobytes(), tokens.refs.tobytes(), tokens.lines.tobytes(), tokens.columns.tobytes(),
+            tokens.value_table)
+
+def buffer_from_data(data):
+    tokens = TokenBuffer()
+    for column, raw in zip((tokens.types, tokens.refs, tokens.lines, tokens.columns), data[:4]):
+        column.frombytes(raw)
+    tokens.value_table = list(data[4])
+    # only strings are interned, each once
+    tokens.string_refs = {value: ref for ref, value in enumerate(tokens.value_table) if value.__class__ is str}
+    return tokens
+
+def diagnostic_data(diagnostic):
+    return (diagnostic.code, diagnostic.token, diagnostic.line, diagnostic.column, diagnostic.expected, diagnostic.detail)
+
+def scan_segment(text, final, first_line=1):
+    """Scan one segment, or return None if its last token may continue past its end.
+
+    Line numbers start at first_line.
+    """
+    scanner = RegexScanner(None, stream=True)
+    scanner.tokens = TokenBuffer()
+    scanner.lines_seen = first_line
+    end = scanner.scan_buffer(text, 0, final)
+    if text[end:].strip():
+        return None
+    tokens = scanner.tokens
+    errors = [index for index, code in enumerate(tokens.types) if code == T_ERROR]
+    return Segment(tokens, errors, text.count('\n'))
+
+class IncrementalCompiler:
+    def __init__(self, token_format="binary"):
+        # token_format decides what the parser sees, as in cli.run_in_process
+        self.token_format = token_format
+        self.segments = {}	# (text digest, final) -> Segment
+        # (mode, segment keys, the two tokens after them, start line if it shows in an error) -> Unit
+        self.units = {}
+        self.spans = {}		# (mode, first segment key) -> set of cached unit spans
+        self.scenes = {}	# id(scene) -> (scene, story lines)
+        self.table = {}		# name -> story_generator.build_render_table() entry, of the last render
+        self.stats = {}
+
+    def compile(self, source, max_errors=None):
+        """Return (tokens, ast, errors) for the source text."""
+        keys, tokens, starts, lines = self.scan(source)
+        parse_tokens = tokens_from_scanner(tokens, self.token_format)
+        ast, errors = self.parse(parse_tokens, keys, starts, lines)
+        if max_errors and len(errors) >= max_errors:
+            # where the parser gives up depends on everything before it: parse in full
+            parser = Parser(parse_tokens, max_errors)
+            ast, errors = parser.parse(), parser.errors
+        return tokens, ast, errors
+
+# scanning
+    def split(self, source):
+        """Yield (text, final) segments of the source."""
+        cuts = [match.start() for match in SEGMENT_START.finditer(source)]
+        if not cuts or cuts[0] != 0:
+            cuts.insert(0, 0)
+        cuts.append(len(source))
+        for start, end in zip(cuts, cuts[1:]):
+            yield source[start:end], end == len(source)
+
+    def scan(self, source):
+        """Scan the source segment by segment.
+
+        Returns the segment keys, the joined TokenBuffer, the index of each
+        segment's first token and the line each segment starts on.
+        """
+        segments = {}
+        keys = []
+        tokens = TokenBuffer()
+        starts = []
+        lines = []
+        line = 1
+        pending = ''
+        scanned = 0
+        for text, final in self.split(source):
+            text = pending + text
+            key = (hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest(), final)
+            segment = segments.get(key) or self.segments.get(key)
+            if segment is None:
+                segment = scan_segment(text, final)
+                if segment is None:
+                    pending = text	# ends mid-token, rescan together with the next segment
+                    continue
+                scanned += 1
+            pending = ''
+            segments[key] = segment
+
+            keys.append(key)
+            starts.append(len(tokens))
+            lines.append(line)
+            base = len(tokens)
+            tokens.extend(segment.tokens, line - 1)
+            if segment.errors and line != 1:
+                for index in segment.errors:
+                    message = relocate_error(segment.tokens.value_at(index), line - 1)
+                    tokens.refs[base + index] = tokens.intern(message)
+            line += segment.lines
+
+        # keep only what this source uses, so the caches don't grow with every edit
+        self.segments = segments
+        self.stats["segments"] = len(keys)
+        self.stats["segments_scanned"] = scanned
+        return keys, tokens, starts, lines
+
+# parsing
+    def parse(self, tokens, keys, starts, lines):
+        """Parse the tokens unit by unit, reusing cached units. Returns (ast, errors)."""
+        parser = Parser(tokens)
+        boundaries = {}
+        for segment_index, start in enumerate(starts):
+            boundaries.setdefault(start, segment_index)
+        errors_at = [index for index, code in enumerate(tokens.types) if code == T_ERROR] if T_ERROR in tokens.types else []
+
+        units = {}
+        spans = {}
+        events = []
+        errors = []
+        parsed = 0
+        mode = TOP
+        segment_index = 0
+        while segment_index < len(keys):
+            start = starts[segment_index]
+            unit = None
+            for span in self.spans.get((mode, keys[segment_index]), ()):
+                key = self.unit_key(tokens, keys, starts, lines, errors_at, mode, segment_index, span)
+                unit = units.get(key) or self.units.get(key)
+                if unit is not None:
+                    break
+            if unit is None:
+                parser.token_index = start
+                parser.current_type = tokens.types[start] if start < len(tokens) else T_NONE
+                del parser.errors[:]
+                unit_mode, unit_events, end = run_unit(parser, mode, boundaries)
+                span = (boundaries[end] if end < len(tokens) else len(keys)) - segment_index
+                key = self.unit_key(tokens, keys, starts, lines, errors_at, mode, segment_index, span)
+                unit = Unit(span, unit_mode, unit_events,
+                            [error.moved(1 - lines[segment_index]) for error in parser.errors])
+                parsed += 1
+            units[key] = unit
+            spans.setdefault((mode, keys[segment_index]), set()).add(unit.span)
+            events.extend(unit.events)
+            errors.extend(error.moved(lines[segment_index] - 1) for error in unit.errors)
+            mode = unit.mode
+            segment_index += unit.span
+
+        self.units = units
+        self.spans = spans
+        self.stats["units"] = len(units)
+        self.stats["units_parsed"] = parsed
+        return build_ast(events), errors
+
+    def unit_key(self, tokens, keys, starts, lines, errors_at, mode, segment_index, span):
+        """Key for the unit of span segments from segment_index: everything its result depends on."""
+        end_segment = segment_index + span
+        end = starts[end_segment] if end_segment < len(keys) else len(tokens)
+        # with their position relative to the unit, which its diagnostics may quote
+        lookahead = tuple((tokens.pair_at(index), tokens.lines[index] - lines[segment_index], tokens.columns[index])
+                          for index in range(end, min(end + 2, len(tokens))))
+        # scanner error messages quote their line, so a unit holding one only matches in place
+        in_place = has_error_between(errors_at, starts[segment_index], end + 2)
+        return (mode, tuple(keys[segment_index:end_segment]), lookahead,
+                lines[segment_index] if in_place else None)
+
+# story
+    def render(self, ast):
+        """Return the story output for the AST, re-rendering only scenes that changed."""
+        previous = self.scenes
+        scenes = {}
+        changed = None	# names whose render table entry differs from the last render
+        rendered = 0
+
+        def render_scene(scene, table):
+            # scene is resolved (see semantics.Program.scenes); its AST node is what units share
+            nonlocal changed, rendered
+            if changed is None:
+                entries = {entry[NAME]: entry for entry in table}
+                changed = set(name for name in entries.keys() | self.table.keys()
+                              if entries.get(name) != self.table.get(name))
+                self.table = entries
+            node = scene[0]
+            if id(node) in scenes:
+                # an earlier 'write story' of this render
+                return scenes[id(node)][1]
+            cached = previous.get(id(node))
+            if cached is not None and cached[0] is node and not changed.intersection(table[index][NAME] for index in scene[3]):
+                lines = cached[1]
+            else:
+                lines = story_generator.render_scene(scene, table)
+                rendered += 1
+            scenes[id(node)] = (node, lines)
+            return lines
+
+        try:
+            return story_generator.render_output(ast, render_scene)
+        finally:
+            self.scenes = scenes
+            self.stats["scenes_rendered"] = rendered
+
+# persistence
+    def save(self, file_path, compiler_hash=''):
+        # marshal, not pickle: the output folder may be shared, and loading marshal data runs no code
+        state = {
+            "version": STATE_VERSION,
+            "compiler_hash": compiler_hash,
+            "token_format": self.token_format,
+            "segments": {key: (buffer_data(segment.tokens), segment.errors, segment.lines)
+                         for key, segment in self.segments.items()},
+            "units": {key: (unit.span, unit.mode, unit.events, [diagnostic_data(error) for error in unit.errors])
+                      for key, unit in self.units.items()},
+            "spans": self.spans,
+            # ids don't survive saving; marshal keeps the scene nodes shared with the units' events
+            "scenes": list(self.scenes.values()),
+            "table": self.table,
+        }
+        with open(file_path, 'wb') as file:
+            marshal.dump(state, file, MARSHAL_VERSION)
+
+    @classmethod
+    def load(cls, file_path, token_format="binary", compiler_hash=''):
+        """Restore a saved compiler, or start a fresh one if the state is missing or stale."""
+        compiler = cls(token_format)
+        try:
+            with open(file_path, 'rb') as file:
+                state = marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return compiler
+        if (not isinstance(state, dict) or state.get("version") != STATE_VERSION
+                or state.get("compiler_hash") != compiler_hash or state.get("token_format") != token_format):
+            return compiler
+        try:
+            segments = {key: Segment(buffer_from_data(tokens), errors, lines)
+                        for key, (tokens, errors, lines) in state["segments"].items()}
+            units = {key: Unit(span, mode, events, [Diagnostic(*error) for error in errors])
+                     for key, (span, mode, events, errors) in state["units"].items()}
+            scenes = {id(scene): (scene, lines) for scene, lines in state["scenes"]}
+        except (KeyError, TypeError, ValueError):
+            return compiler
+        compiler.segments = segments
+        compiler.units = units
+        compiler.spans = state["spans"]
+        compiler.scenes = scenes
+        compiler.table = state["table"]
+        return compiler
+
+def run_unit(parser, mode, boundaries):
+    """Parse from a loop head until the parser is at a loop head on a later boundary.
+
+    Mirrors Parser.iter_blocks, parse_character_block and parse_scene_block.
+    Returns (mode, events, token index stopped at).
+    """
+    start = parser.token_index
+    events = []
+    while True:
+        current = parser.current_type
+        if current and parser.token_index != start and parser.token_index in boundaries:
+            return mode, events, parser.token_index
+        if mode == TOP and not current:
+            return mode, events, parser.token_index
+        try:
+            if mode == TOP:
+                if current == T_CHARACTERS:
+                    parser.match(T_CHARACTERS)
+                    events.append((OPEN_CHARACTERS,))
+                    mode = CHARACTER_ENTRIES
+                elif current == T_SCENES:
+                    parser.match(T_SCENES)
+                    events.append((OPEN_SCENES,))
+                    mode = SCENE_ENTRIES
+                elif current in INSTRUCTION_TOKENS:
+                    block = parser.parse_instruction_block()
+                    if block:
+                        events.append((BLOCK, block))
+                else:
+                    parser.parse_block()	# TOK_ERROR or an unexpected token
+            elif mode == CHARACTER_ENTRIES:
+                action = CHARACTER_LIST[current]
+                if not current or action is STOP:
+                    events.append((CLOSE,))
+                    mode = TOP
+                elif action is ERROR:
+                    parser.error("unexpected-in-character-block")
+                    parser.advance()
+                else:
+                    events.append((ENTRY, action(parser)))
+            else:
+                action = SCENE_LIST[current]
+                if not current or action is STOP:
+                    events.append((CLOSE,))
+                    mode = TOP
+                elif action is ERROR:
+                    parser.error("unexpected-in-scene-block")
+                    parser.advance()
+                else:
+                    events.append((ENTRY, action(parser)))
+        except Exception as e:
+            # as in Parser.iter_blocks: the block being parsed is dropped
+            if mode != TOP:
+                events.append((ABORT,))
+                mode = TOP
+            parser.error("exception", detail=str(e))
+            parser.recover()
+
+def build_ast(events):
+    """Rebuild the top-level blocks from the units' events, as Parser.parse appends them."""
+    ast = []
+    block = None	# ast_nodes kind of the open block
+    entries = None
+    for event in events:
+        kind = event[0]
+        if kind == ENTRY:
+            entries.append(event[1])
+        elif kind == OPEN_CHARACTERS:
+            block, entries = CHARACTER_BLOCK, []
+        elif kind == OPEN_SCENES:
+            block, entries = SCENE_BLOCK_LIST, []
+        elif kind == CLOSE:
+            # an empty character block is dropped
+            if block == SCENE_BLOCK_LIST or entries:
+                ast.append((block, tuple(entries)))
+            block = entries = None
+        elif kind == ABORT:
+            block = entries = None
+        else:
+            ast.append(event[1])
+    return ast
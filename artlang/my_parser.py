@@ -0,0 +1,578 @@
+import argparse
+import bisect
+import contextlib
+import itertools
+import json
+import re
+import sys
+from collections import deque
+from . import ast_store
+from . import grammar
+from .ast_nodes import (
+    CHARACTER_BLOCK, CHARACTER, EVIL, STRENGTH, TRAIT_LIST, SCENE_BLOCK_LIST, SCENE,
+    LOCATION, EVENT, CHARACTERS_PRESENT, WRITE_STORY, PRINT_CHARACTERS,
+    DEFAULT_EVIL, DEFAULT_STRENGTH, intern_symbol, to_json,
+)
+from .diagnostics import Diagnostic, TooManyErrors
+from .grammar import STOP, SKIP, ERROR, Lookahead, Keyword
+from .token_buffer import TokenBuffer
+from .token_stream import MAGIC, is_token_stream, read_token_stream, iter_token_stream, iter_token_records
+from .tokens import (
+    TOK_EQUALS, TOK_COMMA,
+    T_NONE, T_IDENTIFIER, T_ERROR, T_EQUALS,
+    T_CHARACTERS, T_TRAIT, T_EVIL, T_STRENGTH,
+    T_SCENES, T_EVENT, T_LOCATION,
+    T_YES, T_NUMBER,
+    T_WRITE_STORY_INST, T_PRINT_CHARACTERS_INST, TOKEN_CODES, TOKEN_NAMES
+)
+
+# The LL(1) tables for grammar.GRAMMAR, computed once at import
+ARTLANG = grammar.Grammar()
+
+# Token code sets the parser checks against
+SYNC_TOKENS = frozenset(ARTLANG.first["block"])
+INSTRUCTION_TOKENS = frozenset(ARTLANG.first["instruction_block"])
+LIST_TOKENS = frozenset(ARTLANG.first["identifier_list"])
+BOOLEAN_TOKENS = frozenset(ARTLANG.first["boolean"])
+
+# Finds the SYNC_TOKENS in a TokenBuffer's type codes, as bytes
+SYNC_PATTERN = re.compile(b'[' + b''.join(re.escape(bytes([code])) for code in sorted(SYNC_TOKENS)) + b']')
+
+
+class Parser:
+    def __init__(self, tokens, max_errors=None):
+        # Accepts a TokenBuffer, or a list of (type, value) tuples like read_input returns.
+        # The buffer's value table interns the names, so the AST shares one string per name.
+        if not isinstance(tokens, TokenBuffer):
+            tokens = TokenBuffer.from_pairs(tokens)
+        self.tokens = tokens
+        self.types = tokens.types	# token codes, compared as small ints
+        self.token_index = 0
+        self.ast = []
+        self.errors = []	# diagnostics.Diagnostic records
+        self.max_errors = max_errors	# stop parsing after this many errors, if set
+        self.sync_positions = None	# indexes of the SYNC_TOKENS, built by the first recover()
+        self.current_type = self.types[0] if len(self.types) else T_NONE
+
+    @property
+    def current_token(self):
+        """The current token as a (type, value) tuple, or None at the end of input."""
+        if self.current_type == T_NONE:
+            return None
+        return self.tokens.pair_at(self.token_index)
+
+    @property
+    def current_value(self):
+        return self.tokens.value_at(self.token_index)
+
+    @property
+    def current_position(self):
+        """(line, column) of the current token, or (None, None) if unknown."""
+        if self.current_type == T_NONE:
+            return None, None
+        return self.tokens.position_at(self.token_index)
+
+    def advance(self):
+        """Move to the next token."""
+        self.token_index += 1
+        self.current_type = self.types[self.token_index] if self.token_index < len(self.types) else T_NONE
+
+    def error(self, code, expected=None, detail=None):
+        """Record a diagnostic about the current token; past max_errors, stop parsing."""
+        line, column = self.current_position
+        self.errors.append(Diagnostic(code, self.current_token, line, column, expected, detail))
+        if self.max_errors and len(self.errors) >= self.max_errors:
+            self.errors.append(Diagnostic("too-many-errors", detail=self.max_errors))
+            raise TooManyErrors()
+
+    def match(self, expected_token):
+        """Match the expected token code or record an error."""
+        if self.current_type == expected_token:
+            self.advance()
+            return True
+        self.error("expected-token", expected=TOKEN_NAMES[expected_token])
+        return False
+    
+    def peek_next_token_type(self):
+        next_index = self.token_index + 1
+        if next_index < len(self.types):
+            return self.types[next_index]
+        return T_NONE
+
+    def recover(self):
+        """Skip tokens until a synchronization token is found."""
+        if not self.current_type or self.current_type in SYNC_TOKENS:
+            return
+        if self.sync_positions is None:
+            self.sync_positions = [match.start() for match in SYNC_PATTERN.finditer(self.types.tobytes())]
+        start, first = self.token_index, self.current_token
+        found = bisect.bisect_left(self.sync_positions, start)
+        self.token_index = self.sync_positions[found] if found < len(self.sync_positions) else len(self.types)
+        self.current_type = self.types[self.token_index] if self.token_index < len(self.types) else T_NONE
+        print(f"Skipping: {self.token_index - start} tokens from {first}")
+
+    def parse(self):
+        """Start parsing the input and construct the AST."""
+        for block in self.iter_blocks():
+            self.ast.append(block)
+        return self.ast
+
+    def iter_blocks(self):
+        """Yield each top-level block as soon as it has been parsed.
+
+        Stops early, dropping the block being parsed, once max_errors errors are recorded.
+        """
+        try:
+            while self.current_type:
+                try:
+                    block = self.parse_block()
+                except TooManyErrors:
+                    raise
+                except Exception as e:
+                    self.error("exception", detail=str(e))
+                    self.recover()
+                    continue
+                if block:
+                    yield block
+        except TooManyErrors:
+            return
+
+    def parse_block(self):
+        """Parse top-level blocks."""
+        action = BLOCK[self.current_type]
+        if action is not ERROR:
+            return action(self)
+        elif self.current_type == T_ERROR:
+            self.error("token-error")
+            self.advance()
+        else:
+            self.error("unexpected-token")
+            self.recover()
+        return None
+
+# character block
+    def parse_character_block(self):
+        """Parse a character block."""
+        self.match(T_CHARACTERS)
+        characters = []
+
+        while self.current_type:
+            action = CHARACTER_LIST[self.current_type]
+            if action is STOP:
+                # Stop processing when we encounter a scene block or instruction
+                break
+            elif action is ERROR:
+                # Skip unexpected tokens
+                self.error("unexpected-in-character-block")
+                self.advance()
+            else:
+                characters.append(action(self))
+
+        if not characters:
+            return None
+        return (CHARACTER_BLOCK, tuple(characters))
+
+    def parse_character(self):
+        """Parse a character name and its definition."""
+        name = self.current_value
+        self.advance()
+        return (CHARACTER, name, self.parse_character_definition())
+
+    def parse_character_definition(self):
+        """Parse character details like evil, strength, and traits, with defaults."""
+        definition = []
+        present = set()
+
+        while self.current_type:
+            action = CHARACTER_DEFINITION[self.current_type]
+            # Stop parsing details if we encounter a new block or character name
+            if action is STOP:
+                break
+            elif action is SKIP:
+                # Skip stray '=' and ',' tokens
+                self.advance()
+            elif action is ERROR:
+                # Log an error for unexpected tokens
+                self.error("unexpected-in-character-detail")
+                self.advance()
+            else:
+                present.add(self.current_type)
+                definition.append(action(self))
+
+        # Add default values for missing attributes
+        if T_EVIL not in present:
+            definition.append(DEFAULT_EVIL)
+        if T_STRENGTH not in present:
+            definition.append(DEFAULT_STRENGTH)
+
+        return tuple(definition)
+
+    def parse_restricted_assignment(self, token_type=None):
+        """Parse assignments like TOK_EVIL and TOK_STRENGTH with error handling."""
+        if token_type is None:
+            token_type = self.current_type
+        self.match(token_type)
+        if not self.match(T_EQUALS):  # If '=' is missing, skip this assignment
+            self.error("missing-equals", expected=TOKEN_NAMES[token_type])
+            return None
+
+        if token_type == T_EVIL:
+            # Handle missing or invalid values for 'evil'
+            if self.current_type in BOOLEAN_TOKENS:
+                value = self.current_type == T_YES  # Convert TOK_YES/TOK_NO to boolean
+                self.advance()
+                return (EVIL, value)
+            else:
+                self.error("invalid-evil")
+                return DEFAULT_EVIL  # Default value
+
+        elif token_type == T_STRENGTH:
+            # Handle missing or invalid values for 'strength'
+            if self.current_type == T_NUMBER:
+                value = int(self.current_value)
+                self.advance()
+                return (STRENGTH, value)
+            else:
+                self.error("invalid-strength")
+                return DEFAULT_STRENGTH  # Default value
+
+    def parse_trait_list(self):
+        """Parse a list of traits."""
+        self.match(T_TRAIT)
+        self.match(T_EQUALS)
+        return (TRAIT_LIST, self.parse_identifier_list())
+
+    def parse_identifier_list(self):
+        """Parse a comma separated list of names; any other token ends it."""
+        names = []
+        while self.current_type in LIST_TOKENS:
+            if self.current_type == T_IDENTIFIER:
+                names.append(self.current_value)
+            self.advance()
+        return tuple(names)
+# end character block
+    
+# scene block
+    def parse_scene_block(self):
+        """Parse a scene block."""
+        self.match(T_SCENES)  # Match the 'Scenes' token
+        scenes = []
+
+        while self.current_type:
+            action = SCENE_LIST[self.current_type]
+            if action is STOP:
+                # Stop parsing when encountering a new block
+                break
+            elif action is ERROR:
+                # Skip unexpected tokens
+                self.error("unexpected-in-scene-block")
+                self.advance()
+            else:
+                scenes.append(action(self))
+
+        return (SCENE_BLOCK_LIST, tuple(scenes))
+
+    def parse_new_scene(self):
+        """Parse a single scene."""
+        scene_name = self.current_value
+        self.advance()
+        return (SCENE, scene_name, self.parse_scene_definition())
+
+    def parse_scene_definition(self):
+        """Parse details within a scene."""
+        details = []
+
+        while self.current_type:
+            action = SCENE_DEFINITION[self.current_type]
+            if action.__class__ is Lookahead:
+                # a TOK_IDENTIFIER not followed by '=' is the next scene's name
+                action = action.resolve(self.peek_next_token_type())
+            if action.__class__ is Keyword:
+                action = action.action if self.current_value == action.value else ERROR
+            # Stop if encountering a new scene, characters block, or instructions
+            if action is STOP:
+                break
+            elif action is not ERROR:
+                details.append(action(self))
+            else:
+                # Skip unexpected tokens
+                self.error("unexpected-in-scene-definition")
+                self.advance()
+
+        return tuple(details)
+
+    def parse_location_assignment(self):
+        """Parse a location assignment."""
+        self.match(T_LOCATION)
+        self.match(T_EQUALS)
+        location = self.current_token[1]
+        self.advance()
+        return (LOCATION, location)
+
+    def parse_event_assignment(self):
+        """Parse an event assignment."""
+        self.match(T_EVENT)
+        self.match(T_EQUALS)
+        event = self.current_token[1]
+        self.advance()
+        return (EVENT, event)
+    
+    def parse_characters_present(self):
+        """Parse the list of characters present in a scene."""
+        self.match(T_IDENTIFIER)  # Match 'characters'
+        self.match(T_EQUALS)
+        return (CHARACTERS_PRESENT, self.parse_identifier_list())
+# end scene block
+
+    def parse_instruction_block(self):
+        """Parse instructions like 'write story' or 'print characters'."""
+        inst_type = self.current_type
+        self.advance()  # Consume the instruction token
+
+        if inst_type == T_PRINT_CHARACTERS_INST:
+            # Collect character names after 'print characters'
+            return (PRINT_CHARACTERS, self.parse_identifier_list())
+
+        elif inst_type == T_WRITE_STORY_INST:
+            # No characters follow 'write story'
+            return (WRITE_STORY,)
+
+        else:
+            self.error("unexpected-instruction")
+            return None
+
+
+# Dispatch tables for the parser's loops, indexed by token code: the Parser method
+# for the construct a token starts, or STOP, SKIP or ERROR. A repeated block keyword
+# inside a character or scene block is an error rather than the start of a new block.
+PARSE_ACTIONS = {
+    "character_block": Parser.parse_character_block,
+    "scene_block": Parser.parse_scene_block,
+    "instruction_block": Parser.parse_instruction_block,
+    "character": Parser.parse_character,
+    "evil_assignment": Parser.parse_restricted_assignment,
+    "strength_assignment": Parser.parse_restricted_assignment,
+    "trait_list": Parser.parse_trait_list,
+    "scene": Parser.parse_new_scene,
+    "location_assignment": Parser.parse_location_assignment,
+    "event_assignment": Parser.parse_event_assignment,
+    "characters_present": Parser.parse_characters_present,
+}
+BLOCK = ARTLANG.dispatch("block", PARSE_ACTIONS)
+CHARACTER_LIST = ARTLANG.dispatch("character_list", PARSE_ACTIONS, errors={T_CHARACTERS})
+CHARACTER_DEFINITION = ARTLANG.dispatch("character_definition", PARSE_ACTIONS,
+                                        skip=(TOK_EQUALS, TOK_COMMA), errors={T_CHARACTERS})
+SCENE_LIST = ARTLANG.dispatch("scene_list", PARSE_ACTIONS, errors={T_SCENES})
+SCENE_DEFINITION = ARTLANG.dispatch("scene_definition", PARSE_ACTIONS)
+
+# Tokens that end a character or scene block
+CHARACTER_BLOCK_END = frozenset(code for code, action in enumerate(CHARACTER_LIST) if code and action is STOP)
+SCENE_BLOCK_END = frozenset(code for code, action in enumerate(SCENE_LIST) if code and action is STOP)
+
+
+class StreamingParser(Parser):
+    """Parser that pulls tokens from an iterator instead of indexing a full token list.
+
+    Only the current token and, when peek_next_token_type() asks for it, one token
+    of lookahead are held, so iter_blocks() can hand each top-level block on while
+    the rest of the input is still being read. Tokens are (type, value) or
+    (type, value, line, column) tuples; their values are interned in symbols.
+    """
+
+    def __init__(self, tokens, max_errors=None):
+        self.source = iter(tokens)
+        self.lookahead = deque()
+        self.token_index = 0
+        self.ast = []
+        self.errors = []
+        self.max_errors = max_errors
+        self.symbols = {}
+        self.current_type, self.value, self.line, self.column = self.pull()
+
+    def pull(self):
+        """Return the (code, value, line, column) of the next token from the source, or (T_NONE, None, None, None)."""
+        try:
+            token = next(self.source)
+        except StopIteration:
+            return T_NONE, None, None, None
+        value = intern_symbol(self.symbols, token[1])
+        if len(token) > 2:
+            return TOKEN_CODES[token[0]], value, token[2] or None, token[3] or None
+        return TOKEN_CODES[token[0]], value, None, None
+
+    @property
+    def current_token(self):
+        if self.current_type == T_NONE:
+            return None
+        return TOKEN_NAMES[self.current_type], self.value
+
+    @property
+    def current_value(self):
+        return self.value
+
+    @property
+    def current_position(self):
+        return self.line, self.column
+
+    def advance(self):
+        """Move to the next token."""
+        self.token_index += 1
+        if self.lookahead:
+            self.current_type, self.value, self.line, self.column = self.lookahead.popleft()
+        else:
+            self.current_type, self.value, self.line, self.column = self.pull()
+
+    def recover(self):
+        """Skip tokens until a synchronization token is found, one at a time as they arrive."""
+        if not self.current_type or self.current_type in SYNC_TOKENS:
+            return
+        start, first = self.token_index, self.current_token
+        while self.current_type and self.current_type not in SYNC_TOKENS:
+            self.advance()
+        print(f"Skipping: {self.token_index - start} tokens from {first}")
+
+    def peek_next_token_type(self):
+        if not self.lookahead:
+            self.lookahead.append(self.pull())
+        return self.lookahead[0][0]
+
+
+# Process the input file by extracting tokens from lines
+def read_input(file_path):
+    return list(iter_input(file_path))
+
+def iter_input(file_path):
+    with open(file_path, 'r') as file:
+        yield from iter_token_lines(file)
+
+def iter_token_lines(lines):
+    for line in lines:
+        match = re.match(r'<\((\w+),\s*(.*?)\)>', line.strip())
+        if match:
+            token_type, token_value = match.groups()
+            yield (token_type, token_value)
+
+# Read a token file written by the scanner in either format, into a TokenBuffer. The binary
+# stream keeps value types (ints, booleans); the repr text form gives every value back as a string.
+def read_tokens(file_path):
+    if is_token_stream(file_path):
+        return read_token_stream(file_path, TokenBuffer())
+    return TokenBuffer.from_pairs(read_input(file_path))
+
+# Like read_tokens, but yield the tokens one at a time for a StreamingParser; '-' reads stdin
+def iter_tokens(file_path):
+    if file_path == '-':
+        return iter_stdin_tokens(sys.stdin.buffer)
+    if is_token_stream(file_path):
+        return iter_token_stream(file_path)
+    return iter_input(file_path)
+
+def iter_stdin_tokens(stdin):
+    """Yield the tokens on a binary stdin, eg. a pipe from the scanner, in either format as they arrive."""
+    start = stdin.read(len(MAGIC))
+    if start == MAGIC:
+        yield from iter_token_records(stdin, "<stdin>", start)
+    else:
+        lines = itertools.chain([start + stdin.readline()], stdin)
+        yield from iter_token_lines(line.decode('utf-8') for line in lines)
+
+# Convert scanner output to the TokenBuffer read_tokens produces, so an in-process
+# pipeline parses exactly what the file round trip in token_format would
+def tokens_from_scanner(scanner_tokens, token_format="binary"):
+    if token_format == "text":
+        return TokenBuffer.from_pairs((token.type, str(token.value)) for token in scanner_tokens)
+    if isinstance(scanner_tokens, TokenBuffer):
+        return scanner_tokens
+    return TokenBuffer.from_tokens(scanner_tokens)
+
+def write_ast(ast, file_path, ast_format="json"):
+    if ast_format != "json":
+        ast_store.write_ast(ast, file_path, ast_format)
+        return
+    with open(file_path, "w") as outfile:
+        json.dump([to_json(block) for block in ast], outfile, indent=4)
+
+def write_ast_stream(blocks, file_path, ast_format="json"):
+    """Write top-level blocks as they arrive; the file matches write_ast byte for byte."""
+    with open(file_path, "wb" if ast_format == "binary" else "w") as outfile:
+        write_blocks(blocks, outfile, ast_format)
+
+def write_blocks(blocks, outfile, ast_format="json"):
+    """write_ast_stream to an open file, eg. stdout: text for the JSON formats, binary for binary."""
+    if ast_format != "json":
+        # the compact and binary writers already write one block at a time
+        ast_store.write_ast_file(blocks, outfile, ast_format)
+        return
+    separator = "[\n"
+    for block in blocks:
+        outfile.write(separator)
+        # json.dump(ast, indent=4) nests every block one level (four spaces) deep
+        outfile.write("    " + json.dumps(to_json(block), indent=4).replace("\n", "\n    "))
+        separator = ",\n"
+    outfile.write("[]" if separator == "[\n" else "\n]")
+
+def main():
+    parser = argparse.ArgumentParser(description="Addison's ArtLang Parser")
+    parser.add_argument("file", help="Please enter the path to the input file ('-' streams tokens from stdin)")
+    parser.add_argument(
+        "--output", "-o", default="ast_output.json",
+        help="Path to the output file for the AST, or '-' for stdout (default: ast_output.json)"
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Read tokens incrementally and write each top-level block as soon as it is parsed"
+    )
+    parser.add_argument(
+        "--max-errors", type=int, default=None,
+        help="Stop parsing after this many errors (default: no limit)"
+    )
+    parser.add_argument(
+        "--format", choices=ast_store.AST_FORMATS, default="json",
+        help="AST file format: indented json, compact one-block-per-line json, or binary (default: json)"
+    )
+    args = parser.parse_args()
+    if args.file == '-':
+        # a pipe is parsed as it arrives
+        args.stream = True
+
+    if args.output == '-':
+        # the AST goes to stdout, so keep the messages out of it
+        ast_output = sys.stdout.buffer if args.format == "binary" else sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            run_parser(args, ast_output)
+        ast_output.flush()
+    else:
+        run_parser(args)
+
+def run_parser(args, ast_output=None):
+    if args.stream:
+        # Steps 1, 2 and 4 interleaved: tokens are read, parsed and written a block at a time
+        my_parser = StreamingParser(iter_tokens(args.file), args.max_errors)
+        if ast_output is not None:
+            write_blocks(my_parser.iter_blocks(), ast_output, args.format)
+        else:
+            write_ast_stream(my_parser.iter_blocks(), args.output, args.format)
+    else:
+        # Step 1: Tokenize input
+        tokens = read_tokens(args.file)
+
+        # Step 2: Parse the tokens using your Parser class
+        my_parser = Parser(tokens, args.max_errors)
+        ast = my_parser.parse()
+
+    # Step 3: Print errors to console, if any
+    if my_parser.errors:
+        for error in my_parser.errors:
+            print(f"Error: {error.format()}")
+    else:
+        print("Parsing complete successfully.")
+
+    # Step 4: Write AST to output file
+    if ast_output is not None and not args.stream:
+        write_blocks(ast, ast_output, args.format)
+    elif not args.stream:
+        write_ast(ast, args.output, args.format)
+    print(f"AST written to {args.output}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
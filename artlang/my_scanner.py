@@ -0,0 +1,523 @@
+from .tokens import TOKENS, INSTRUCTIONS
+from .token_buffer import Token, TokenBuffer
+from .token_stream import write_token_stream, write_token_records
+import argparse
+import contextlib
+import re
+import sys
+
+class Scanner:
+    def __init__(self, file_path, stream=False):
+        self.file_path = file_path
+        self.stream = stream
+        # a streaming scanner reads the file from iter_tokens() instead
+        self.input = '' if stream else self.read_source()
+        self.cur_index = 0
+        self.tokens = []
+        # Error reporting
+        self.errors = []
+        self.line = 1
+        self.column = 1
+        self.token_start = (1, 1)	# position of the token being scanned
+    
+    def read_source(self):
+        try:
+            with open(self.file_path, 'r') as file:
+                return file.read()
+        except FileNotFoundError:
+            print(f"Error: File '{self.file_path}' not found.")
+        except IOError:
+            print(f"Error: Could not read file '{self.file_path}'.")
+        return ''
+
+    def get_next_char(self):
+        if self.cur_index >= len(self.input):
+            return None		# this should be the end of the input
+        char = self.input[self.cur_index]
+        self.cur_index += 1
+
+        if char == '\n':
+            self.line += 1
+            self.column = 1 # reset column at new line
+        else:
+            self.column += 1
+
+        return char
+    
+    def get_position(self):
+        return self.line, self.column
+    
+    def peek_char(self):
+        # peak at the next char without incrementing
+        if self.cur_index >= len(self.input):
+            return None
+        return self.input[self.cur_index]
+    
+    def add_token(self, token_type, value=None, position=None):
+        if value is None:
+            value = TOKENS.get(token_type, token_type)
+        line, column = position or self.token_start
+        if self.tokens.__class__ is TokenBuffer:
+            self.tokens.add(token_type, value, line, column)
+        else:
+            self.tokens.append(Token(token_type, value, line, column))
+
+    # tokenize a boolean value
+    def scan_boolean(self):
+        next_word = ''
+        while self.peek_char() and self.peek_char().isalpha():
+            next_word += self.get_next_char()
+        
+        if next_word == TOKENS['TOK_YES'] or next_word.lower() == 'true':
+            return True
+        elif next_word == TOKENS['TOK_NO'] or next_word.lower() == 'false':
+            return False
+        else:
+            # Signal an invalid boolean
+            self.add_token('TOK_ERROR', f"Invalid boolean value: {next_word}")
+            return None
+
+    # tokenize a NUMBER and its value
+    def scan_number(self, first_digit):
+        no = first_digit
+        while self.peek_char() and self.peek_char().isdigit():
+            no += self.get_next_char()
+        if no.isdigit():
+            self.add_token('TOK_NUMBER', int(no))
+        else:
+            self.add_token('TOK_ERROR', None)
+
+    def scan_instruction(self, first_word):
+        instruction_parts = [first_word]
+
+        # Attempt to match a single-word instruction
+        instruction = ' '.join(instruction_parts).lower()
+        if instruction in INSTRUCTIONS:
+            return instruction, INSTRUCTIONS[instruction]
+
+        # Handle multi-word instructions
+        while self.peek_char() == ' ':
+            self.get_next_char()  # consume space
+            next_word = ''
+            while self.peek_char() and self.peek_char().isalnum():
+                next_word += self.get_next_char()
+
+            instruction_parts.append(next_word)
+            instruction = ' '.join(instruction_parts).lower()
+
+            if instruction in INSTRUCTIONS:
+                return instruction, INSTRUCTIONS[instruction] 
+
+        # Not an instruction
+        return None, None
+
+    # main scanning function
+    def scan(self):
+        while self.cur_index < len(self.input):
+            self.scan_step()
+
+        return self.tokens
+
+    def scan_columnar(self):
+        """Scan into a columnar TokenBuffer instead of a list of Token objects."""
+        self.tokens = TokenBuffer()
+        return self.scan()
+
+    def iter_tokens(self):
+        """Yield tokens one at a time. The per-character scanner needs the whole input."""
+        if self.stream:
+            self.input = self.read_source()
+        yield from self.scan()
+
+    def scan_step(self):
+        """Consume one character, scanning the token it starts (if any)."""
+        self.token_start = self.get_position()
+        char = self.get_next_char()
+
+        if char.isspace():
+            return	# ignore spaces, newlines
+
+        elif char.isalpha():
+            self.scan_word(char)
+
+        elif char.isdigit():
+            self.scan_number(char)
+        
+        elif char == '=':
+            self.add_token('TOK_EQUALS')
+        elif char == ',':
+            self.add_token('TOK_COMMA')
+        else: # unexpected character (not isalpha or isdigit) 
+
+            # ignore and try to continue, log error messages
+            line, column = self.get_position()
+            # self.errors.append(f"Error: Unexpected character '{char}' at line {line}, column {column}")    defunct
+            self.add_token('TOK_ERROR', f"Error: Unexepcted character '{char}' at line {line}, column {column}")
+
+    def scan_word(self, first_char):
+        word = first_char
+        # maximum munches till the next space
+        while self.peek_char() and self.peek_char().isalnum():
+            word += self.get_next_char()
+        
+        if word.endswith(','):
+            word=word.rstrip(',')
+        if not word:
+            return # skip empty value due to extra comma
+        
+        # First checks for instructions
+        instruction, token = self.scan_instruction(word)
+        if token:
+            self.add_token(token, instruction)
+            return  # Immediately return after successfully matching the instruction
+
+        # Handle 'print characters' case specifically
+        if token == 'TOK_PRINT_CHARACTERS_INST':
+            characters = []
+            # Skip initial spaces and commas
+            while self.peek_char() and (self.peek_char().isspace() or self.peek_char() == ','):
+                self.get_next_char()
+            
+            # Check if there are any character names
+            if self.peek_char() and self.peek_char().isalpha():
+                while self.peek_char():
+                    # Skip spaces and commas
+                    while self.peek_char() and (self.peek_char().isspace() or self.peek_char() == ','):
+                        self.get_next_char()
+                    
+                    # Collect character name
+                    char_name = ''
+                    while self.peek_char() and self.peek_char().isalpha():
+                        char_name += self.get_next_char()
+                    
+                    if char_name:
+                        characters.append(char_name)
+                    else:
+                        break
+
+                # Add characters as tokens
+                for char in characters:
+                    self.add_token('TOK_IDENTIFIER', char)
+            return  # Explicitly return after handling 'print characters'
+
+        if word == TOKENS['TOK_CHARACTERS']:
+            self.add_token('TOK_CHARACTERS')
+
+        elif word == TOKENS['TOK_TRAIT']:
+            self.add_token('TOK_TRAIT')
+
+        elif word == TOKENS['TOK_EVIL']:
+            self.add_token('TOK_EVIL')
+
+        elif word == TOKENS['TOK_STRENGTH']:
+            self.add_token('TOK_STRENGTH')
+
+        elif word == TOKENS['TOK_SCENES']:
+            self.add_token('TOK_SCENES')
+
+        elif word == TOKENS['TOK_EVENT']:
+            self.add_token('TOK_EVENT')
+            
+            event_desc = ""
+
+            if self.peek_char() == '=':
+                self.add_token('TOK_EQUALS', position=self.get_position())
+                self.get_next_char()
+
+            # Skip spaces
+            while self.peek_char() and self.peek_char().isspace():
+                self.get_next_char()
+            self.token_start = self.get_position()
+
+            # include everything until the next newline or line break
+            while self.peek_char() and self.peek_char() not in ['\n', '\r']:
+                event_desc += self.get_next_char()
+
+            self.add_token('TOK_IDENTIFIER', event_desc.strip())
+
+        elif word == TOKENS['TOK_LOCATION']:
+            self.add_token('TOK_LOCATION')
+
+        elif word == TOKENS['TOK_YES'] or word.lower() == 'true':
+            self.add_token('TOK_YES', True)
+        elif word == TOKENS['TOK_NO'] or word.lower() == 'false':
+            self.add_token('TOK_NO', False)
+        else:
+            # must be IDENTIFIER (variable name or string 'value'), catch all case
+            self.add_token('TOK_IDENTIFIER', word)
+
+# Keywords that map straight to their token; 'event' also pulls in the rest of its line
+KEYWORDS = {
+    TOKENS['TOK_CHARACTERS']: 'TOK_CHARACTERS',
+    TOKENS['TOK_TRAIT']: 'TOK_TRAIT',
+    TOKENS['TOK_EVIL']: 'TOK_EVIL',
+    TOKENS['TOK_STRENGTH']: 'TOK_STRENGTH',
+    TOKENS['TOK_SCENES']: 'TOK_SCENES',
+    TOKENS['TOK_EVENT']: 'TOK_EVENT',
+    TOKENS['TOK_LOCATION']: 'TOK_LOCATION',
+}
+
+# One master pattern for the whole scanner. The character classes follow the str
+# methods the per-character Scanner uses: \s is isspace(), [^\W_] is isalnum().
+MASTER_PATTERN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<word>[^\W\d_][^\W_]*)
+  | (?P<number>\d+)
+  | (?P<equals>=)
+  | (?P<comma>,)
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+# scan_instruction keeps consuming ' ' + alnum* after a word until the next non-space
+WORD_TAIL_PATTERN = re.compile(r'(?: [^\W_]*)+')
+EVENT_DESC_PATTERN = re.compile(r'\s*([^\r\n]*)')
+
+# Characters read per chunk by RegexScanner.iter_tokens()
+CHUNK_SIZE = 1 << 20
+
+class RegexScanner(Scanner):
+    """Scanner backend driven by one compiled master pattern.
+
+    Produces the same token stream as Scanner, but matches whole runs of
+    whitespace, words, numbers and event lines at a time instead of calling
+    get_next_char() per character. With iter_tokens() it scans the file in
+    bounded chunks, so memory use does not grow with the size of the source.
+    """
+
+    def __init__(self, file_path, stream=False):
+        super().__init__(file_path, stream)
+        # line bookkeeping for error positions, in absolute offsets across chunks
+        self.base = 0		# offset of the current buffer's first character
+        self.counted_to = 0	# newlines before this offset are counted in lines_seen
+        self.lines_seen = 1
+        self.line_start = 0
+
+    def scan(self):
+        self.cur_index = self.scan_buffer(self.input, 0, final=True)
+        return self.tokens
+
+    def iter_tokens(self, chunk_size=CHUNK_SIZE):
+        """Yield tokens while reading the source in chunks of chunk_size characters."""
+        try:
+            file = open(self.file_path, 'r')
+        except FileNotFoundError:
+            print(f"Error: File '{self.file_path}' not found.")
+            return
+        except IOError:
+            print(f"Error: Could not read file '{self.file_path}'.")
+            return
+
+        with file:
+            buffer = ''
+            final = False
+            while not final:
+                # read at least as much again as is buffered, so a huge token is rescanned only a few times
+                chunk = file.read(max(chunk_size, len(buffer)))
+                final = not chunk
+                buffer += chunk
+                pos = self.scan_buffer(buffer, 0, final)
+                # keep only the unfinished tail; tokens are handed out as they complete
+                self.position_at(buffer, pos)	# count the newlines being dropped
+                self.base += pos
+                buffer = buffer[pos:]
+                yield from self.tokens
+                self.tokens.clear()
+
+    def scan_buffer(self, text, pos, final):
+        """Scan tokens from text[pos:] and return the position scanning stopped at.
+
+        Unless final, a word, number, whitespace run or event line that reaches
+        the end of text might continue in the next chunk, so scanning stops
+        before it and its tokens are left for the next call.
+        """
+        end = len(text)
+        self.input = text
+
+        while pos < end:
+            match = MASTER_PATTERN.match(text, pos)
+            kind = match.lastgroup
+            start_tokens = len(self.tokens)
+            line_state = (self.counted_to, self.lines_seen, self.line_start)
+
+            if kind == 'space':
+                next_pos = match.end()
+
+            elif kind == 'word':
+                if not text[pos].isalpha():
+                    # [^\W\d_] also admits numeric characters like '½' that isalpha() rejects;
+                    # hand the rare odd character back to the per-character scanner
+                    pos = self.fallback_step(text, pos)
+                    continue
+                next_pos = self.scan_word_at(text, match.group(), pos, match.end())
+
+            elif kind == 'number':
+                self.add_token('TOK_NUMBER', int(match.group()), self.position_at(text, pos))
+                next_pos = match.end()
+
+            elif kind == 'equals':
+                self.add_token('TOK_EQUALS', position=self.position_at(text, pos))
+                pos = match.end()
+                continue
+
+            elif kind == 'comma':
+                self.add_token('TOK_COMMA', position=self.position_at(text, pos))
+                pos = match.end()
+                continue
+
+            else:
+                line, column = self.position_at(text, pos)
+                # the message reports the column after consuming the character, as get_position() does
+                self.add_token('TOK_ERROR', f"Error: Unexepcted character '{match.group()}' at line {line}, column {column + 1}", (line, column))
+                pos = match.end()
+                continue
+
+            if next_pos >= end and not final:
+                del self.tokens[start_tokens:]
+                self.counted_to, self.lines_seen, self.line_start = line_state
+                break
+            pos = next_pos
+
+        return pos
+
+    def position_at(self, text, pos):
+        """Return the (line, column) of text[pos], as get_position() reports before consuming it."""
+        counted_to = self.counted_to - self.base
+        newlines = text.count('\n', counted_to, pos)
+        if newlines:
+            self.lines_seen += newlines
+            self.line_start = self.base + text.rfind('\n', counted_to, pos) + 1
+        self.counted_to = self.base + pos
+        return self.lines_seen, self.base + pos - self.line_start + 1
+
+    def fallback_step(self, text, pos):
+        """Scan one step from pos with the per-character scanner, return the new position."""
+        self.line, self.column = self.position_at(text, pos)
+        self.cur_index = pos
+        self.scan_step()
+        return self.cur_index
+
+    def scan_word_at(self, text, word, start, pos):
+        """Emit the token(s) for the word text[start:pos], return the position after them."""
+        position = self.position_at(text, start)
+
+        # Instructions: mirrors scan_instruction, including the words it swallows on a miss
+        parts = [word]
+        if word.lower() in INSTRUCTIONS:
+            instruction = word.lower()
+            self.add_token(INSTRUCTIONS[instruction], instruction, position)
+            return pos
+        tail = WORD_TAIL_PATTERN.match(text, pos)
+        if tail:
+            offset = pos
+            for next_word in tail.group().split(' ')[1:]:
+                offset += 1 + len(next_word)
+                parts.append(next_word)
+                instruction = ' '.join(parts).lower()
+                if instruction in INSTRUCTIONS:
+                    self.add_token(INSTRUCTIONS[instruction], instruction, position)
+                    return offset
+            pos = tail.end()
+
+        token = KEYWORDS.get(word)
+        if token == 'TOK_EVENT':
+            self.add_token('TOK_EVENT', position=position)
+            if text.startswith('=', pos):
+                self.add_token('TOK_EQUALS', position=self.position_at(text, pos))
+                pos += 1
+            # include everything until the next newline or line break
+            desc = EVENT_DESC_PATTERN.match(text, pos)
+            self.add_token('TOK_IDENTIFIER', desc.group(1).strip(), self.position_at(text, desc.start(1)))
+            return desc.end()
+        elif token:
+            self.add_token(token, position=position)
+        elif word == TOKENS['TOK_YES'] or word.lower() == 'true':
+            self.add_token('TOK_YES', True, position)
+        elif word == TOKENS['TOK_NO'] or word.lower() == 'false':
+            self.add_token('TOK_NO', False, position)
+        else:
+            # must be IDENTIFIER (variable name or string 'value'), catch all case
+            self.add_token('TOK_IDENTIFIER', word, position)
+        return pos
+
+# Scanner backends selectable from the command line
+SCANNERS = {
+    "regex": RegexScanner,
+    "legacy": Scanner,
+}
+
+# Token file formats: the typed binary stream, or repr() text lines for debugging
+TOKEN_FORMATS = ("binary", "text")
+
+def write_tokens(tokens, file_path, token_format="binary"):
+    """Write tokens to file_path as a binary token stream, or one repr per line."""
+    if token_format == "binary":
+        write_token_stream(tokens, file_path)
+        return
+    with open(file_path, "w") as output_file:
+        write_token_lines(tokens, output_file)
+
+def write_token_lines(tokens, output_file):
+    for token in tokens:
+        output_file.write(f"{repr(token)}\n")  # Write each token on a new line
+
+def write_tokens_to_stdout(tokens, stdout, token_format="binary"):
+    """Write tokens to stdout (eg. a pipe to the parser) in token_format."""
+    if token_format == "binary":
+        write_token_records(tokens, stdout.buffer)
+        stdout.buffer.flush()
+    else:
+        write_token_lines(tokens, stdout)
+        stdout.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Addison's ArtLang Scanner")
+    parser.add_argument("file", help="Path to the input file")
+    parser.add_argument(
+        "--output", "-o", default="scanner_out.bin",
+        help="Path to the output file for tokens, or '-' for stdout (default: scanner_out.bin)"
+    )
+    parser.add_argument(
+        "--format", choices=TOKEN_FORMATS, default="binary",
+        help="Token file format: typed 'binary' stream (default) or repr 'text' lines for debugging"
+    )
+    parser.add_argument(
+        "--scanner", choices=sorted(SCANNERS), default="regex",
+        help="Scanner backend: 'regex' (default) or the per-character 'legacy' scanner"
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Read the source in chunks and write tokens as they are found"
+    )
+    args = parser.parse_args()
+
+    if args.output == '-':
+        # tokens go to stdout, so keep the messages out of them
+        token_output = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            run_scanner(args, token_output)
+    else:
+        run_scanner(args)
+
+def run_scanner(args, token_output=None):
+    print(f"Processing file: {args.file}")
+
+    # Initialize the scanner and process the file
+    scanner = SCANNERS[args.scanner](args.file, stream=args.stream)
+    tokens = scanner.iter_tokens() if args.stream else scanner.scan()
+
+    # Write tokens to the specified output file
+    if token_output is not None:
+        write_tokens_to_stdout(tokens, token_output, args.format)
+    else:
+        write_tokens(tokens, args.output, args.format)
+
+    print(f"Tokens written to: {args.output}")
+
+    # Print errors to the console (if any)
+    if scanner.errors:
+        print("\nErrors encountered during scanning:")
+        for error in scanner.errors:
+            print(error)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Parallel scanning and parsing of one large program.
+
+The source is cut into chunks at header lines (lines without '=', the same
+cut points incremental.py uses), so every chunk starts at the beginning of a
+line and scans on its own. Each worker process scans one chunk, with line
+numbers starting where the chunk does, and parses it with incremental.run_unit
+from the loop the parser is most likely in there: between the entries of the
+Characters or Scenes block above it, or at the top level. It stops at the
+chunk's end, looking at the first tokens of the next chunk as the sequential
+parser would.
+
+Those guesses are checked in order: a chunk's result is used only if the
+previous chunk stopped exactly at its start, in the loop it assumed. Anywhere
+else, eg. after 'location =' took the next line's keyword as its value, the
+parent process parses on from where the previous chunk really stopped until it
+is back at a loop head on a chunk boundary, and carries on from there. A chunk
+whose last token might continue into the next one is merged with it. The
+tokens, AST, diagnostics and parser output are the same as a sequential scan
+and Parser.parse().
+"""
+import concurrent.futures
+import contextlib
+import io
+import os
+import re
+from .incremental import (
+    SEGMENT_START, TOP, CHARACTER_ENTRIES, SCENE_ENTRIES,
+    scan_segment, run_unit, build_ast,
+)
+from .my_parser import Parser, tokens_from_scanner
+from .my_scanner import RegexScanner
+from .token_buffer import TokenBuffer
+from .tokens import T_NONE
+
+# Below this many characters a program is scanned and parsed in one piece
+MIN_PARALLEL_SIZE = 1 << 16
+
+# Chunks per worker, so a slow chunk doesn't leave the other workers idle
+CHUNKS_PER_JOB = 4
+
+# Lines that open a block, and the loop the parser is in after them
+BLOCK_LINE = re.compile(r'^[^\S\n]*(?:(Characters)|(Scenes)|(?i:write story|print characters))(?![^\W_])', re.M)
+
+class ChunkResult:
+    __slots__ = ('tokens', 'mode', 'complete', 'lookahead', 'end_mode', 'events', 'errors', 'output')
+
+    def __init__(self, tokens, mode, complete, lookahead, end_mode, events, errors, output):
+        self.tokens = tokens	# TokenBuffer of the chunk, with absolute line numbers
+        self.mode = mode	# loop the chunk was parsed from
+        self.complete = complete	# whether the parse stopped exactly at the chunk's end
+        self.lookahead = lookahead	# the tokens after the chunk the parser was shown
+        self.end_mode = end_mode
+        self.events = events
+        self.errors = errors
+        self.output = output	# what the parser printed, eg. "Skipping: ..."
+
+def lookahead_key(tokens, index):
+    """The two tokens from index on, with their positions, which diagnostics may quote."""
+    return tuple((tokens.pair_at(i), tokens.lines[i], tokens.columns[i])
+                 for i in range(index, min(index + 2, len(tokens))))
+
+def lookahead_text(source, start):
+    """The text from start through its second non-blank line, which holds the two tokens after a chunk."""
+    end = start
+    for _ in range(2):
+        while True:
+            line_end = source.find('\n', end) + 1 or len(source)
+            blank = not source[end:line_end].strip()
+            end = line_end
+            if not blank or end == len(source):
+                break
+    return source[start:end]
+
+def split_chunks(source, count):
+    """Return (start, end, mode) for up to count chunks of about equal size."""
+    cuts = [0]
+    for target in range(1, count):
+        match = SEGMENT_START.search(source, max(cuts[-1] + 1, len(source) * target // count))
+        if match is None:
+            break
+        if match.start() > cuts[-1]:
+            cuts.append(match.start())
+    cuts.append(len(source))
+
+    chunks = []
+    mode = TOP
+    blocks = BLOCK_LINE.finditer(source)
+    block = next(blocks, None)
+    for start, end in zip(cuts, cuts[1:]):
+        # the loop the parser is in when it reaches start: after the last block line before it
+        while block is not None and block.start() < start:
+            mode = CHARACTER_ENTRIES if block.group(1) else SCENE_ENTRIES if block.group(2) else TOP
+            block = next(blocks, None)
+        chunks.append((start, end, mode))
+    return chunks
+
+def scan_parse_chunk(text, next_text, first_line, mode, token_format):
+    """Scan and parse one chunk; returns a ChunkResult, or None if it must be merged with the next.
+
+    next_text is lookahead_text() of the next chunk, or None for the last chunk.
+    """
+    segment = scan_segment(text, next_text is None, first_line)
+    if segment is None:
+        return None
+    tokens = segment.tokens
+    parse_tokens = TokenBuffer()
+    parse_tokens.extend(tokens)
+    if next_text is not None:
+        # usually the same tokens as in the whole source; compile_source checks
+        scanner = RegexScanner(None, stream=True)
+        scanner.tokens = TokenBuffer()
+        scanner.lines_seen = first_line + segment.lines
+        scanner.scan_buffer(next_text, 0, True)
+        parse_tokens.extend(scanner.tokens)
+
+    parser = Parser(tokens_from_scanner(parse_tokens, token_format))
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        end_mode, events, stop = run_unit(parser, mode, {len(tokens)})
+    # stopping at the end of input only stands for stopping at the next chunk in the last chunk
+    complete = stop == len(tokens) and (next_text is None or stop < len(parse_tokens))
+    return ChunkResult(tokens, mode, complete, lookahead_key(parse_tokens, len(tokens)),
+                       end_mode, events, parser.errors, output.getvalue())
+
+def compile_source(source, jobs=None, token_format="binary", max_errors=None):
+    """Return (tokens, ast, errors) for the source text, like a sequential scan and parse."""
+    jobs = jobs or os.cpu_count() or 1
+    count = 1 if jobs == 1 or len(source) < MIN_PARALLEL_SIZE else jobs * CHUNKS_PER_JOB
+    chunks = split_chunks(source, count)
+
+    def arguments(index, start, end, mode):
+        next_text = None if index == len(chunks) - 1 else lookahead_text(source, end)
+        return source[start:end], next_text, source.count('\n', 0, start) + 1, mode, token_format
+
+    tasks = [arguments(index, *chunk) for index, chunk in enumerate(chunks)]
+    if len(tasks) == 1:
+        results = [scan_parse_chunk(*tasks[0])]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(scan_parse_chunk, *zip(*tasks)))
+
+    # merge chunks whose last token may run on into the next one, redoing them here
+    index = 0
+    while index < len(chunks):
+        if results[index] is None:
+            start, _, mode = chunks[index]
+            _, end, _ = chunks.pop(index + 1)
+            chunks[index] = (start, end, mode)
+            results.pop(index + 1)
+            results[index] = scan_parse_chunk(*arguments(index, start, end, mode))
+        else:
+            index += 1
+
+    tokens = TokenBuffer()
+    starts = []
+    for result in results:
+        starts.append(len(tokens))
+        tokens.extend(result.tokens)
+    parse_tokens = tokens_from_scanner(tokens, token_format)
+
+    events = []
+    errors = []
+    output = []
+    parser = None
+    # an empty chunk starts where the next one does, and is passed over
+    boundaries = {start: index for index, start in enumerate(starts)}
+    mode = TOP
+    index = 0
+    while index < len(results):
+        result = results[index]
+        end = starts[index + 1] if index + 1 < len(starts) else len(tokens)
+        if result.complete and result.mode == mode and result.lookahead == lookahead_key(tokens, end):
+            events.extend(result.events)
+            errors.extend(result.errors)
+            output.append(result.output)
+            mode = result.end_mode
+            index += 1
+            continue
+        # the guess for this chunk was wrong: parse on from where the last chunk stopped
+        if parser is None:
+            parser = Parser(parse_tokens)
+        start = starts[index]
+        parser.token_index = start
+        parser.current_type = parse_tokens.types[start] if start < len(parse_tokens) else T_NONE
+        del parser.errors[:]
+        unit_output = io.StringIO()
+        with contextlib.redirect_stdout(unit_output):
+            mode, unit_events, stop = run_unit(parser, mode, boundaries)
+        events.extend(unit_events)
+        errors.extend(parser.errors)
+        output.append(unit_output.getvalue())
+        index = boundaries.get(stop, len(results)) if stop < len(tokens) else len(results)
+
+    if max_errors and len(errors) >= max_errors:
+        # where the parser gives up depends on everything before it: parse in full
+        parser = Parser(parse_tokens, max_errors)
+        return tokens, parser.parse(), parser.errors
+    print(''.join(output), end='')
+    return tokens, build_ast(events), errors
@@ -0,0 +1,145 @@
+"""Semantic analysis: the AST resolved into the Program the story generator runs.
+
+analyze() builds the symbol table of the program's characters and scenes and
+resolves every character a scene or 'print characters' names to the
+character's index, once. What can't be resolved is reported as diagnostics:
+
+    undefined-character     a scene names a character that isn't defined (error)
+    empty-scene             a scene with a location has no characters (error)
+    malformed-assignment    a character's assignment is missing its '=' (error)
+    duplicate-character     a character is defined again; the last one is used
+    duplicate-scene         two scenes share a name; both are in the story
+    unknown-printed-character  'print characters' names an undefined character,
+                               printed as "Character not found."
+
+The scenes are only resolved, and checked, when a 'write story' instruction
+puts them in the output, so a lazily loaded AST whose instructions only print
+characters never decodes its scene blocks.
+"""
+from . import ast_store
+from .ast_nodes import TRAIT_LIST, EVIL, STRENGTH, LOCATION, EVENT, CHARACTERS_PRESENT, WRITE_STORY
+from .diagnostics import Diagnostic, SemanticError
+
+class Program:
+    __slots__ = ('names', 'characters', 'scenes', 'instructions')
+
+    def __init__(self, names, characters, scenes, instructions):
+        self.names = names	# character names, by character index
+        # name -> {"traits", "evil", "strength"}, in character index order
+        self.characters = characters
+        # (scene node, location, event, character indexes) in story order, or None when not resolved
+        self.scenes = scenes
+        # (instruction node, character indexes) in program order; the indexes of a
+        # 'print characters' instruction's names, None for the undefined ones
+        self.instructions = instructions
+
+def program_blocks(ast):
+    """Return the indexes of the AST's blocks by kind (ast_store.CHARACTERS, SCENES, INSTRUCTION), in program order.
+
+    A lazily loaded AST tells the kinds without decoding the blocks.
+    """
+    kind_of = ast.kind_of if isinstance(ast, ast_store.LazyAST) else lambda index: ast_store.block_kind(ast[index])
+    blocks = {ast_store.CHARACTERS: [], ast_store.SCENES: [], ast_store.INSTRUCTION: []}
+    for index in range(len(ast)):
+        kind = kind_of(index)
+        if kind in blocks:
+            blocks[kind].append(index)
+    return blocks
+
+def character_attributes(definition):
+    traits = []
+    evil = False
+    strength = 0  # Default to 0 if not specified
+
+    for detail in definition:
+        if detail is None:
+            # an assignment missing its '=', reported by analyze()
+            continue
+        kind = detail[0]
+        if kind == TRAIT_LIST:
+            traits.extend(detail[1])
+        elif kind == EVIL:
+            evil = detail[1]
+        elif kind == STRENGTH:
+            strength = detail[1]
+    return {"traits": traits, "evil": evil, "strength": strength}
+
+def scene_details(scene):
+    """Return the (location, event, present_characters) of a scene node."""
+    location = None
+    event = None
+    present_characters = []
+
+    for kind, value in scene[2]:
+        if kind == LOCATION:
+            location = value
+        elif kind == CHARACTERS_PRESENT:
+            present_characters = value
+        elif kind == EVENT:
+            event = value
+
+    return location, event, present_characters
+
+def analyze(ast, scenes=None):
+    """Return (program, diagnostics) for the AST.
+
+    scenes says whether to resolve the scenes; by default they are resolved
+    when an instruction writes the story.
+    """
+    blocks = program_blocks(ast)
+    diagnostics = []
+
+    characters = {}
+    for index in blocks[ast_store.CHARACTERS]:
+        for _, name, definition in ast[index][1]:
+            if name in characters:
+                diagnostics.append(Diagnostic("duplicate-character", detail=name))
+            if None in definition:
+                diagnostics.append(Diagnostic("malformed-assignment", detail=name))
+            characters[name] = character_attributes(definition)
+    names = list(characters)
+    symbols = {name: index for index, name in enumerate(names)}
+
+    instructions = []
+    for index in blocks[ast_store.INSTRUCTION]:
+        instruction = ast[index]
+        if instruction[0] == WRITE_STORY:
+            instructions.append((instruction, None))
+            if scenes is None:
+                scenes = True
+            continue
+        indexes = tuple(symbols.get(name) for name in instruction[1])
+        for name, character in zip(instruction[1], indexes):
+            if character is None:
+                diagnostics.append(Diagnostic("unknown-printed-character", detail=name))
+        instructions.append((instruction, indexes))
+
+    resolved = None
+    if scenes:
+        resolved = []
+        scene_names = set()
+        for index in blocks[ast_store.SCENES]:
+            for scene in ast[index][1]:
+                name = scene[1]
+                if name in scene_names:
+                    diagnostics.append(Diagnostic("duplicate-scene", detail=name))
+                scene_names.add(name)
+                location, event, present = scene_details(scene)
+                indexes = []
+                for character in present:
+                    if character not in symbols:
+                        diagnostics.append(Diagnostic("undefined-character", detail=(character, name)))
+                    indexes.append(symbols.get(character))
+                if location and not present:
+                    diagnostics.append(Diagnostic("empty-scene", detail=name))
+                resolved.append((scene, location, event, tuple(indexes)))
+
+    return Program(names, characters, resolved, instructions), diagnostics
+
+def resolve(ast, scenes=None):
+    """Return (program, warnings) for the AST, or raise SemanticError listing its errors."""
+    program, diagnostics = analyze(ast, scenes)
+    errors = [diagnostic for diagnostic in diagnostics if diagnostic.is_error]
+    if errors:
+        raise SemanticError(errors)
+    return program, [diagnostic for diagnostic in diagnostics if not diagnostic.is_error]
@@ -0,0 +1,108 @@
+"""The compile server behind ArtLang.py --serve and artlang_client.py.
+
+Imported only to serve, so that a plain compile doesn't load socketserver.
+"""
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import time
+import traceback
+
+from .cli import main
+
+def default_socket_path():
+    # artlang_client.default_socket_path() is a copy, so that it doesn't have to import the package; change both together
+    return os.environ.get("ARTLANG_SOCKET") or os.path.join(tempfile.gettempdir(), f"artlang-{os.getuid()}.sock")
+
+class CompileServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    """Handles every connection in a fork of the server, which has the compiler already imported."""
+
+class CompileRequestHandler(socketserver.StreamRequestHandler):
+    """One request per connection: a JSON line in, a JSON line out.
+
+    The request is {"args": [...], "cwd": ..., "source": ...}: a command line for
+    ArtLang.py, the directory to run it in, and optionally the program text to
+    compile in place of an input file named "-". The response carries the
+    exit code and everything the command printed.
+    """
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return	# eg. serve() checking whether a server is already listening
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = {"exit_code": 2, "stdout": "", "stderr": f"Bad request: {e}\n", "seconds": 0}
+        else:
+            response = handle_request(request)
+        try:
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+        except BrokenPipeError:
+            pass	# the client went away
+
+def handle_request(request):
+    """Run a client's command line in this process and return its exit code and output."""
+    start = time.perf_counter()
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            args = request.get("args", [])
+            if "--serve" in args:
+                raise SystemExit("Error: a client cannot start another server")
+            if "--watch" in args:
+                raise SystemExit("Error: --watch runs until interrupted; run it with ArtLang.py instead")
+            os.chdir(request.get("cwd") or os.getcwd())
+            main(args, request.get("source"))
+            exit_code = 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                exit_code = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                exit_code = 1
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+    return {
+        "exit_code": exit_code,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "seconds": round(time.perf_counter() - start, 6),
+    }
+
+def serve(socket_path):
+    """Serve compile requests on socket_path until interrupted."""
+    # Import everything a compile needs once, so the forked handlers start warm
+    from . import compile_cache
+    from . import incremental
+
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(socket_path)	# left behind by a server that is gone
+        else:
+            print(f"Error: a server is already listening on {socket_path}")
+            sys.exit(1)
+        finally:
+            probe.close()
+
+    server = CompileServer(socket_path, CompileRequestHandler)
+    # let `kill` shut the server down cleanly too, removing the socket file
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"ArtLang compile server listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
+        os.remove(socket_path)
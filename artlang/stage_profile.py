@@ -0,0 +1,133 @@
+"""Per-stage measurements for ArtLang.py --profile.
+
+Each stage records wall and CPU time (including the CPU time of a stage run
+as a subprocess), peak resident memory, bytes read and written, and the
+counts the caller fills in: tokens, AST nodes and errors.
+
+Peak memory comes from the kernel's high-water mark rather than tracemalloc,
+which would slow the stages down several times over. On Linux the mark is
+reset before each stage; elsewhere it is the process's peak so far, and
+"peak_rss_scope" says which. For a subprocess stage it is the child's peak,
+known when that child was the largest so far.
+"""
+import contextlib
+import json
+import os
+import resource
+import sys
+import time
+from .tokens import T_ERROR
+
+# ru_maxrss is in kilobytes on Linux, but in bytes on macOS
+MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+def reset_peak_rss():
+    """Reset this process's peak RSS, if the platform allows it (Linux 4.0+)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss():
+    """Peak resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_UNIT
+
+def count_nodes(ast):
+    """Count the nodes in an AST (a list, or an ast_store.LazyAST, of ast_nodes tuples)."""
+    count = 0
+    pending = list(ast)
+    while pending:
+        node = pending.pop()
+        if node.__class__ is tuple:
+            # a node starts with its kind; other tuples are sequences of nodes or names
+            if node and node[0].__class__ is int:
+                count += 1
+            pending.extend(node)
+    return count
+
+def count_error_tokens(tokens):
+    """Count the TOK_ERROR tokens in a TokenBuffer."""
+    return tokens.types.count(T_ERROR)
+
+def file_size(path):
+    # 0 for a missing file, or None for an artifact that wasn't written
+    if path is None:
+        return 0
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+class StageProfiler:
+    def __init__(self, cprofile_stage=None):
+        self.cprofile_stage = cprofile_stage	# stage to run under cProfile, if any
+        self.stages = []
+        self.profiles = {}	# stage name -> cProfile.Profile
+        self.start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name, subprocess=False, covers=()):
+        """Measure the body as stage name; yields the record for the caller to add counts to.
+
+        covers names the stages a combined stage stands in for, eg. for cprofile_stage.
+        """
+        record = {
+            "stage": name,
+            "cached": False,
+            "tokens": None,
+            "ast_nodes": None,
+            "errors": None,
+            "bytes_read": 0,
+            "bytes_written": 0,
+        }
+        profile = None
+        if (name == self.cprofile_stage or self.cprofile_stage in covers) and not subprocess:
+            import cProfile
+            profile = cProfile.Profile()
+        peak_reset = reset_peak_rss()
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield record
+        except Exception as e:
+            record["failed"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profile:
+                profile.disable()
+                self.profiles[name] = profile
+            record["wall_seconds"] = round(time.perf_counter() - wall, 6)
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            child_cpu = (after.ru_utime - children.ru_utime) + (after.ru_stime - children.ru_stime)
+            record["cpu_seconds"] = round(time.process_time() - cpu + child_cpu, 6)
+            if subprocess:
+                grew = after.ru_maxrss > children.ru_maxrss
+                record["peak_rss_bytes"] = after.ru_maxrss * MAXRSS_UNIT if grew else None
+                record["peak_rss_scope"] = "subprocess"
+            else:
+                record["peak_rss_bytes"] = peak_rss()
+                record["peak_rss_scope"] = "stage" if peak_reset else "process"
+            self.stages.append(record)
+
+    def write(self, output_folder, **details):
+        """Write profile.json, and <stage>.prof for the cProfile'd stage, to output_folder."""
+        report = dict(details)
+        report["wall_seconds"] = round(time.perf_counter() - self.start, 6)
+        report["stages"] = self.stages
+        profile_file = os.path.join(output_folder, "profile.json")
+        with open(profile_file, "w") as file:
+            json.dump(report, file, indent=4)
+        for name, profile in self.profiles.items():
+            profile.dump_stats(os.path.join(output_folder, f"{name}.prof"))
+        return profile_file
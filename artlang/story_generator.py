@@ -0,0 +1,180 @@
+import argparse
+import os
+import sys
+from . import ast_store
+from . import semantics
+from .ast_nodes import WRITE_STORY
+from .diagnostics import SemanticError, SEMANTIC_ERROR_STATUS
+
+def load_ast(file_path):
+    # compact and binary ASTs are decoded a block at a time, as they are used; '-' reads stdin
+    if file_path == '-':
+        return ast_store.load_ast_data(sys.stdin.buffer.read(), "<stdin>")
+    return ast_store.load_ast(file_path)
+
+# Fields of a render table entry
+NAME, INTRO, DETAILS = range(3)
+
+def build_render_table(program):
+    """Precompute the text each character contributes to the output, once per program.
+
+    The entries are (name, intro, details), by character index: scenes, the
+    fight branch and print characters only concatenate these pieces.
+    """
+    table = []
+    for name, char in program.characters.items():
+        traits = ", ".join(char["traits"])
+        evil = "yes" if char["evil"] else "no"
+        table.append((
+            name,
+            f"{traits} {name}",	# how a scene introduces the character
+            f"{name} -> Traits: {traits}, Evil: {evil}, Strength: {char['strength']}",
+        ))
+    return table
+
+def print_characters_instruction(instruction_block, indexes, table):
+    """The character details of a resolved 'print characters' instruction (see semantics.Program)."""
+    # Determine characters to print: all or specified ones
+    if not indexes:
+        return "\n".join(entry[DETAILS] for entry in table)
+
+    lines = [table[index][DETAILS] if index is not None else f"{name} -> Character not found."
+             for name, index in zip(instruction_block[1], indexes)]
+    return "\n".join(lines)
+
+def render_scene(scene, table):
+    """Return the story lines for one resolved scene, from the characters' render table entries."""
+    _, location, event, present_characters = scene
+    story_lines = []
+
+    # Generate scene narrative
+    if location:
+        story_lines.append(f"It was a normal day in {location} with " +
+            ", ".join(table[c][INTRO] for c in present_characters[:-1]) +
+            f" and {table[present_characters[-1]][INTRO]}.")
+
+    if event:
+        story_lines.append(f"Suddenly, {event}.")
+
+    # Add specific character interactions
+    if event == "fight" and len(present_characters) == 2:
+        char1, char2 = present_characters
+        story_lines.append(f"{table[char2][NAME]} attacks {table[char1][NAME]}. After a long fight, " +
+            f"{table[char1][INTRO]} emerges victorious. "
+            f"All the evil is defeated, and the world is happy again...")
+    return story_lines
+
+def iter_story_lines(program, render_scene=render_scene, table=None):
+    """Yield the story of a resolved program line by line, rendering each scene only when it is reached.
+
+    The scenes of all the scene blocks make up the story.
+    """
+    if table is None:
+        table = build_render_table(program)
+
+    # Process each scene
+    for scene in program.scenes:
+        yield from render_scene(scene, table)
+
+def generate_story(ast, render_scene=render_scene):
+    program, _ = semantics.resolve(ast, scenes=True)
+    return "\n".join(iter_story_lines(program, render_scene))
+
+def iter_output(ast, render_scene=render_scene):
+    """Run the program's instructions against the AST, yielding the output text piece by piece.
+
+    The AST is resolved by semantics.resolve() first, so a program with
+    undefined characters fails before any output is generated. Every
+    instruction block then runs in program order, each adding a section to
+    the output, against the characters and scenes of the whole program. The
+    pieces join up to exactly the text render_output() returns, but the story
+    is generated as it is consumed instead of held in memory.
+    """
+    program, warnings = semantics.resolve(ast)
+    for warning in warnings:
+        # on stderr: the pipeline captures the generator's stdout (see cli.relay_warnings)
+        print(f"Warning: {warning.format()}", file=sys.stderr)
+    table = build_render_table(program)	# shared by all the instructions
+
+    separator = ""	# between the output sections
+    for instruction_block, indexes in program.instructions:
+        # 'write story' instruction
+        if instruction_block[0] == WRITE_STORY:
+            yield separator + "--- Story ---\n\n"
+            newline = ""
+            for line in iter_story_lines(program, render_scene, table):
+                yield newline + line
+                newline = "\n"
+
+        # 'print characters' instruction
+        else:
+            yield separator + "--- Character Details ---\n\n"
+            yield print_characters_instruction(instruction_block, indexes, table)
+        separator = "\n\n"
+
+def render_output(ast, render_scene=render_scene):
+    """Run the program's instructions against the AST and return the output text.
+
+    render_scene can be swapped for a memoized version (see incremental.py).
+    """
+    return "".join(iter_output(ast, render_scene))
+
+def write_story(text, file_path):
+    with open(file_path, 'w') as f:
+        f.write(text)
+
+# Characters collected before each write to the output
+WRITE_CHUNK = 1 << 16
+
+def write_story_stream(pieces, file_path):
+    """Write output pieces (eg. from iter_output) as they are generated; '-' writes to stdout.
+
+    A file is written under a temporary name and renamed into place once the
+    whole story is out, so a generator error leaves no partial story behind.
+    """
+    if file_path == '-':
+        write_pieces(pieces, sys.stdout)
+        sys.stdout.flush()
+        return
+    directory, name = os.path.split(os.path.abspath(file_path))
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    try:
+        with open(tmp_path, 'w') as f:
+            write_pieces(pieces, f)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def write_pieces(pieces, output_file):
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= WRITE_CHUNK:
+            output_file.write("".join(buffer))
+            buffer.clear()
+            size = 0
+    output_file.write("".join(buffer))
+
+def main():
+    parser = argparse.ArgumentParser(description="ArtLang story_generator.py")
+    parser.add_argument("ast_file", help="Path to the AST input file ('-' reads it from stdin)")
+    parser.add_argument("--output", "-o", required=True, help="Output file for the generated story ('-' for stdout)")
+    args = parser.parse_args()
+
+    # Load AST
+    ast = load_ast(args.ast_file)
+
+    # write output as it is generated
+    try:
+        write_story_stream(iter_output(ast), args.output)
+        if args.output != '-':
+            print(f"Story successfully written to {args.output}")
+    except SemanticError as e:
+        print(e, file=sys.stderr)
+        sys.exit(SEMANTIC_ERROR_STATUS)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
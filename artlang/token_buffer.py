@@ -0,0 +1,117 @@
+"""Compact token representations shared by the scanner and the parser."""
+from array import array
+from .tokens import TOKEN_CODES, TOKEN_NAMES
+
+class Token:
+    __slots__ = ('type', 'value', 'line', 'column')
+
+    def __init__(self, type_, value, line=None, column=None):
+        self.type = type_	# type of token, eg. TOK_IDENTIFIER, TOK_TRAIT...
+        self.value = value	# value of token
+        self.line = line	# source position of the token's first character
+        self.column = column
+
+# https://docs.python.org/3/library/functions.html#repr
+    def __repr__(self):
+        return f'<({self.type}, {self.value})>'
+
+class TokenBuffer:
+    """Tokens stored column by column instead of one object per token.
+
+    types holds the small-int code of each token (tokens.TOKEN_CODES), refs an
+    index into the value table, and lines/columns the source position (0 when
+    unknown). Equal string values share one entry in the value table.
+    """
+    __slots__ = ('types', 'refs', 'lines', 'columns', 'value_table', 'string_refs')
+
+    def __init__(self):
+        self.types = array('B')
+        self.refs = array('I')
+        self.lines = array('I')
+        self.columns = array('I')
+        self.value_table = []
+        self.string_refs = {}	# str value -> index in value_table
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """Build a buffer from scanner Tokens."""
+        buffer = cls()
+        add = buffer.add
+        for token in tokens:
+            add(token.type, token.value, token.line, token.column)
+        return buffer
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Build a buffer from (type, value) tuples, eg. from my_parser.read_input."""
+        buffer = cls()
+        add = buffer.add
+        for type_, value in pairs:
+            add(type_, value)
+        return buffer
+
+    def add(self, type_, value, line=None, column=None):
+        self.add_code(TOKEN_CODES[type_], value, line, column)
+
+    def add_code(self, code, value, line=None, column=None):
+        self.types.append(code)
+        self.refs.append(self.intern(value))
+        self.lines.append(line or 0)
+        self.columns.append(column or 0)
+
+    def intern(self, value):
+        """Return the value table index for value, adding it if needed."""
+        if value.__class__ is str:
+            ref = self.string_refs.get(value)
+            if ref is None:
+                ref = self.string_refs[value] = len(self.value_table)
+                self.value_table.append(value)
+            return ref
+        # numbers and booleans are not interned: True == 1 would share an entry
+        self.value_table.append(value)
+        return len(self.value_table) - 1
+
+    def extend(self, other, line_offset=0):
+        """Append all tokens of another buffer, shifting their line numbers by line_offset."""
+        refs = [self.intern(value) for value in other.value_table]
+        self.types.extend(other.types)
+        self.refs.extend(array('I', [refs[ref] for ref in other.refs]))
+        if line_offset:
+            self.lines.extend(array('I', [line + line_offset if line else 0 for line in other.lines]))
+        else:
+            self.lines.extend(other.lines)
+        self.columns.extend(other.columns)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __delitem__(self, index):
+        # only truncation is needed (RegexScanner rolls back unfinished tokens)
+        if not isinstance(index, slice) or index.stop is not None or index.step is not None:
+            raise TypeError("TokenBuffer only supports deleting a tail slice, eg. del buffer[n:]")
+        del self.types[index]
+        del self.refs[index]
+        del self.lines[index]
+        del self.columns[index]
+
+    def type_at(self, index):
+        return TOKEN_NAMES[self.types[index]]
+
+    def value_at(self, index):
+        return self.value_table[self.refs[index]]
+
+    def position_at(self, index):
+        """Return (line, column) of the token at index, or (None, None) if unknown."""
+        return self.lines[index] or None, self.columns[index] or None
+
+    def pair_at(self, index):
+        """Return the token at index as a (type, value) tuple."""
+        return TOKEN_NAMES[self.types[index]], self.value_table[self.refs[index]]
+
+    def __getitem__(self, index):
+        line, column = self.position_at(index)
+        return Token(self.type_at(index), self.value_at(index), line, column)
+
+    def __iter__(self):
+        for index in range(len(self.types)):
+            yield self[index]
@@ -0,0 +1,211 @@
+"""Binary token stream shared by the scanner and the parser.
+
+Layout (all integers little-endian):
+    header   b'ARTK', u8 format version
+    record   u8 token type code (tokens.TOKEN_CODES), u8 value tag,
+             u32 line, u32 column (0 when unknown), then the value:
+               VAL_STR      u32 byte length + UTF-8 bytes; the string also gets
+                            the next index in the stream's string table
+               VAL_STR_REF  u32 index of a string already in the table
+               VAL_INT      u32 byte length + two's complement bytes
+               VAL_NONE, VAL_FALSE, VAL_TRUE carry no payload
+
+Unlike the repr() text form, values keep their Python types and may contain
+any character, including ')>' and newlines. Keywords and character names
+repeat constantly, so each distinct string is only written (and decoded) once.
+"""
+import struct
+from .tokens import TOKEN_CODES, TOKEN_NAMES
+
+MAGIC = b'ARTK'
+VERSION = 1
+
+# value tags
+VAL_NONE = 0
+VAL_STR = 1
+VAL_STR_REF = 2
+VAL_INT = 3
+VAL_FALSE = 4
+VAL_TRUE = 5
+
+HEADER = struct.Struct('<4sB')
+RECORD = struct.Struct('<BBII')
+LENGTH = struct.Struct('<I')
+
+# records are written out in batches so streamed tokens never pile up in memory
+FLUSH_RECORDS = 8192
+
+class TokenStreamError(Exception):
+    pass
+
+def encode_int(value):
+    data = value.to_bytes(value.bit_length() // 8 + 1, 'little', signed=True)
+    return LENGTH.pack(len(data)) + data
+
+def write_token_stream(tokens, file_path):
+    """Write scanner Tokens (any iterable) to file_path in the binary format."""
+    with open(file_path, 'wb') as output_file:
+        write_token_records(tokens, output_file)
+
+def write_token_records(tokens, output_file):
+    """Write scanner Tokens to a binary file object, eg. a pipe, in the binary format."""
+    pack_record = RECORD.pack
+    pack_length = LENGTH.pack
+    codes = TOKEN_CODES
+    strings = {}	# string -> index in the string table
+    output_file.write(HEADER.pack(MAGIC, VERSION))
+    pending = []
+    append = pending.append
+    for token in tokens:
+        value = token.value
+        code = codes[token.type]
+        line, column = token.line or 0, token.column or 0
+        if value.__class__ is str:
+            index = strings.get(value)
+            if index is None:
+                strings[value] = len(strings)
+                data = value.encode('utf-8')
+                append(pack_record(code, VAL_STR, line, column))
+                append(pack_length(len(data)))
+                append(data)
+            else:
+                append(pack_record(code, VAL_STR_REF, line, column))
+                append(pack_length(index))
+        elif value is None:
+            append(pack_record(code, VAL_NONE, line, column))
+        elif value is True or value is False:
+            append(pack_record(code, VAL_TRUE if value else VAL_FALSE, line, column))
+        elif isinstance(value, int):
+            append(pack_record(code, VAL_INT, line, column))
+            append(encode_int(value))
+        else:
+            raise TokenStreamError(f"Cannot encode token value {value!r} of type {type(value).__name__}")
+        if len(pending) >= FLUSH_RECORDS:
+            output_file.write(b''.join(pending))
+            pending.clear()
+    output_file.write(b''.join(pending))
+
+def is_token_stream(file_path):
+    with open(file_path, 'rb') as input_file:
+        return input_file.read(len(MAGIC)) == MAGIC
+
+def check_header(header, file_path):
+    if len(header) < HEADER.size:
+        raise TokenStreamError(f"'{file_path}' is not a token stream: file too short")
+    magic, version = HEADER.unpack_from(header, 0)
+    if magic != MAGIC:
+        raise TokenStreamError(f"'{file_path}' is not a token stream")
+    if version != VERSION:
+        raise TokenStreamError(f"Unsupported token stream version {version} in '{file_path}'")
+
+def read_token_stream(file_path, buffer=None):
+    """Read a binary token stream into a list of (type, value, line, column) records.
+
+    Given a TokenBuffer, the tokens are added to it instead and the buffer is returned.
+    """
+    with open(file_path, 'rb') as input_file:
+        data = input_file.read()
+
+    check_header(data, file_path)
+
+    names = TOKEN_NAMES
+    if buffer is None:
+        records = []
+        add_record = records.append
+        add = lambda code, value, line, column: add_record((names[code], value, line or None, column or None))
+    else:
+        records = buffer
+        add = buffer.add_code
+    strings = []
+    unpack_record = RECORD.unpack_from
+    unpack_length = LENGTH.unpack_from
+    record_size = RECORD.size
+    length_size = LENGTH.size
+    offset = HEADER.size
+    end = len(data)
+    try:
+        while offset < end:
+            code, tag, line, column = unpack_record(data, offset)
+            if code not in names:
+                raise TokenStreamError(f"Unknown token type code {code} at byte {offset}")
+            offset += record_size
+            if tag == VAL_STR_REF:
+                value = strings[unpack_length(data, offset)[0]]
+                offset += length_size
+            elif tag == VAL_STR:
+                length = unpack_length(data, offset)[0]
+                offset += length_size
+                value = data[offset:offset + length].decode('utf-8')
+                strings.append(value)
+                offset += length
+            elif tag == VAL_INT:
+                length = unpack_length(data, offset)[0]
+                offset += length_size
+                value = int.from_bytes(data[offset:offset + length], 'little', signed=True)
+                offset += length
+            elif tag == VAL_NONE:
+                value = None
+            elif tag == VAL_TRUE:
+                value = True
+            elif tag == VAL_FALSE:
+                value = False
+            else:
+                raise TokenStreamError(f"Unknown value tag {tag} at byte {offset - record_size}")
+            add(code, value, line, column)
+    except (struct.error, KeyError, IndexError, UnicodeDecodeError) as e:
+        raise TokenStreamError(f"Corrupt token stream '{file_path}' near byte {offset}: {e}")
+    if offset > end:
+        raise TokenStreamError(f"Token stream '{file_path}' is truncated")
+    return records
+
+def iter_token_stream(file_path):
+    """Yield (type, value, line, column) records from a binary token stream one at a time."""
+    with open(file_path, 'rb') as input_file:
+        yield from iter_token_records(input_file, file_path)
+
+def iter_token_records(input_file, file_path, start=b''):
+    """Like iter_token_stream, from a binary file object such as a pipe.
+
+    start is the beginning of the stream if it has already been read from
+    input_file, eg. to tell the format. file_path names the stream in errors.
+    """
+    check_header(start + input_file.read(HEADER.size - len(start)), file_path)
+    read = input_file.read
+    strings = []
+
+    def read_exact(size):
+        data = read(size)
+        if len(data) != size:
+            raise TokenStreamError(f"Token stream '{file_path}' is truncated")
+        return data
+
+    while True:
+        head = read(RECORD.size)
+        if not head:
+            return
+        if len(head) != RECORD.size:
+            raise TokenStreamError(f"Token stream '{file_path}' is truncated")
+        code, tag, line, column = RECORD.unpack(head)
+        if code not in TOKEN_NAMES:
+            raise TokenStreamError(f"Unknown token type code {code} in '{file_path}'")
+        if tag == VAL_STR_REF:
+            index, = LENGTH.unpack(read_exact(LENGTH.size))
+            if index >= len(strings):
+                raise TokenStreamError(f"Bad string reference {index} in '{file_path}'")
+            value = strings[index]
+        elif tag == VAL_STR:
+            length, = LENGTH.unpack(read_exact(LENGTH.size))
+            value = read_exact(length).decode('utf-8')
+            strings.append(value)
+        elif tag == VAL_INT:
+            length, = LENGTH.unpack(read_exact(LENGTH.size))
+            value = int.from_bytes(read_exact(length), 'little', signed=True)
+        elif tag == VAL_NONE:
+            value = None
+        elif tag == VAL_TRUE:
+            value = True
+        elif tag == VAL_FALSE:
+            value = False
+        else:
+            raise TokenStreamError(f"Unknown value tag {tag} in '{file_path}'")
+        yield (TOKEN_NAMES[code], value, line or None, column or None)
@@ -47,4 +47,45 @@ TOKENS = {
     TOK_NUMBER: 'NUMBER',
     TOK_WRITE_STORY_INST: 'write story',
     TOK_PRINT_CHARACTERS_INST: 'print characters'
-}
\ No newline at end of file
+}
+
+# Small-int token codes, used by TokenBuffer, the parser's comparisons and the binary
+# token stream (token_stream.py). Codes are part of the file format: append new
+# tokens, never renumber existing ones. 0 is reserved for "no token".
+T_NONE = 0
+T_IDENTIFIER = 1
+T_ERROR = 2
+T_EQUALS = 3
+T_COMMA = 4
+T_CHARACTERS = 5
+T_TRAIT = 6
+T_EVIL = 7
+T_STRENGTH = 8
+T_SCENES = 9
+T_EVENT = 10
+T_LOCATION = 11
+T_YES = 12
+T_NO = 13
+T_NUMBER = 14
+T_WRITE_STORY_INST = 15
+T_PRINT_CHARACTERS_INST = 16
+
+TOKEN_CODES = {
+    TOK_IDENTIFIER: T_IDENTIFIER,
+    TOK_ERROR: T_ERROR,
+    TOK_EQUALS: T_EQUALS,
+    TOK_COMMA: T_COMMA,
+    TOK_CHARACTERS: T_CHARACTERS,
+    TOK_TRAIT: T_TRAIT,
+    TOK_EVIL: T_EVIL,
+    TOK_STRENGTH: T_STRENGTH,
+    TOK_SCENES: T_SCENES,
+    TOK_EVENT: T_EVENT,
+    TOK_LOCATION: T_LOCATION,
+    TOK_YES: T_YES,
+    TOK_NO: T_NO,
+    TOK_NUMBER: T_NUMBER,
+    TOK_WRITE_STORY_INST: T_WRITE_STORY_INST,
+    TOK_PRINT_CHARACTERS_INST: T_PRINT_CHARACTERS_INST,
+}
+TOKEN_NAMES = {code: name for name, code in TOKEN_CODES.items()}
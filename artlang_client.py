@@ -0,0 +1,58 @@
+"""Thin client for the ArtLang compile server (`python ArtLang.py --serve`).
+
+Takes the same arguments as ArtLang.py, has the server run them and prints
+what it printed:
+
+    python artlang_client.py sample_code/test1.txt --output_folder test1
+    cat program.txt | python artlang_client.py - -o out
+
+Use --socket PATH (first) to talk to a server on another socket. Only the
+standard library's socket and json are loaded here, so a compile costs little
+more than the compile itself.
+"""
+import json
+import os
+import socket
+import sys
+import tempfile
+
+def default_socket_path():
+    # a copy of artlang.server.default_socket_path(), kept here so the package isn't imported; change both together
+    return os.environ.get("ARTLANG_SOCKET") or os.path.join(tempfile.gettempdir(), f"artlang-{os.getuid()}.sock")
+
+def request_compile(args, socket_path=None, source=None):
+    """Send a command line to the server and return its response dict."""
+    request = {"args": args, "cwd": os.getcwd()}
+    if source is not None:
+        request["source"] = source
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path or default_socket_path())
+        connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        chunks = []
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return json.loads(b"".join(chunks))
+
+def main():
+    args = sys.argv[1:]
+    socket_path = default_socket_path()
+    if args[:1] == ["--socket"] and len(args) > 1:
+        socket_path, args = args[1], args[2:]
+
+    # "-" as the input file sends the program text from stdin
+    source = sys.stdin.read() if "-" in args else None
+    try:
+        response = request_compile(args, socket_path, source)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"Error: no ArtLang server on {socket_path}; start one with `python ArtLang.py --serve`", file=sys.stderr)
+        sys.exit(1)
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    sys.exit(response["exit_code"])
+
+if __name__ == "__main__":
+    main()
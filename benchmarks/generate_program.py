@@ -0,0 +1,86 @@
+"""Seeded generator of synthetic ArtLang programs, for benchmarking.
+
+The same parameters and seed always give the same program. Programs are valid
+unless error_rate is set, in which case that fraction of the detail lines get a
+stray character, or for evil and strength lose their value. Either kind of
+error is reported by the scanner or parser without stopping the story from
+being generated.
+"""
+import argparse
+import random
+
+TRAITS = [
+    "brave", "humble", "smart", "jealous", "confused", "witty", "calm", "sneaky",
+    "quick", "strong", "determined", "clever", "resourceful", "aggressive", "observant",
+    "mysterious", "cunning", "bold", "restless", "curious", "gentle", "proud",
+]
+LOCATIONS = ["classroom", "village", "forest", "museum", "studio", "harbor", "castle", "market"]
+EVENT_WORDS = [
+    "the", "lights", "go", "out", "a", "storm", "arrives", "painting", "class", "begins",
+    "pillow", "duel", "exhibition", "opens", "someone", "steals", "masterpiece", "rain",
+]
+STRAY_CHARACTERS = "@#$%&!?"
+
+def generate_program(characters=10, traits=3, scenes=10, characters_per_scene=2,
+                     event_length=3, error_rate=0.0, seed=0, instruction="write story"):
+    """Return the text of a generated program."""
+    rng = random.Random(seed)
+    names = [f"Artist{index}" for index in range(characters)]
+    lines = []
+
+    def detail(text, droppable=False):
+        # only evil and strength fall back to a default when their value is missing
+        if error_rate and rng.random() < error_rate:
+            if droppable and rng.random() < 0.5:
+                text = text.split("=")[0] + "="
+            else:
+                text = f"{text} {rng.choice(STRAY_CHARACTERS)}"
+        lines.append(f"        {text}")
+
+    lines.append("Characters")
+    for name in names:
+        lines.append(f"    {name}")
+        detail(f"evil = {rng.choice(['yes', 'no'])}", droppable=True)
+        detail(f"trait = {', '.join(rng.sample(TRAITS, min(traits, len(TRAITS))))}")
+        detail(f"strength = {rng.randint(0, 100)}", droppable=True)
+        lines.append("")
+
+    lines.append("Scenes")
+    for index in range(scenes):
+        present = rng.sample(names, min(characters_per_scene, len(names)))
+        if len(present) == 2 and rng.random() < 0.2:
+            event = "fight"
+        else:
+            event = " ".join(rng.choice(EVENT_WORDS) for _ in range(event_length))
+        lines.append(f"    Scene{index}")
+        detail(f"location = {rng.choice(LOCATIONS)}")
+        lines.append(f"        characters = {', '.join(present)}")
+        # the event takes the rest of its line, so a stray character would just be part of it
+        lines.append(f"        event = {event}")
+        lines.append("")
+
+    lines.append(instruction)
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic ArtLang program")
+    parser.add_argument("--output", "-o", required=True, help="Path to write the program to")
+    parser.add_argument("--characters", type=int, default=10, help="Number of characters (default: 10)")
+    parser.add_argument("--traits", type=int, default=3, help="Traits per character (default: 3)")
+    parser.add_argument("--scenes", type=int, default=10, help="Number of scenes (default: 10)")
+    parser.add_argument("--characters-per-scene", type=int, default=2, help="Characters present in each scene (default: 2)")
+    parser.add_argument("--event-length", type=int, default=3, help="Words per event line (default: 3)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of detail lines given an error (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    program = generate_program(
+        args.characters, args.traits, args.scenes, args.characters_per_scene,
+        args.event_length, args.error_rate, args.seed,
+    )
+    with open(args.output, "w") as file:
+        file.write(program)
+    print(f"Program written to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Time the scanner, parser and story generator on generated programs of growing size.
+
+For every scale the base program size (characters and scenes) is multiplied
+by the scale, the program is generated with generate_program() and each stage
+is timed on its own: Scanner.scan, Parser.parse and generate_story. The best
+of --repeat runs is reported, with tokens/sec, blocks/sec and the stage's
+peak memory (measured in a separate tracemalloc run, which would skew the
+timings). Results are written as JSON.
+
+    python benchmarks/run_benchmarks.py --scales 1 10 100 --output results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from generate_program import generate_program
+from artlang.ast_nodes import CHARACTER_BLOCK, SCENE_BLOCK_LIST
+from artlang.my_scanner import SCANNERS
+from artlang.my_parser import Parser, tokens_from_scanner
+from artlang import story_generator
+
+def count_blocks(ast):
+    """Count character, scene and instruction blocks, including the scene block lists."""
+    blocks = 0
+    for block in ast:
+        if block[0] == CHARACTER_BLOCK:
+            blocks += len(block[1])
+        elif block[0] == SCENE_BLOCK_LIST:
+            blocks += 1 + len(block[1])
+        else:
+            blocks += 1
+    return blocks
+
+def measure(run, repeat):
+    """Return (best wall seconds over repeat runs, peak traced bytes, result of the last run)."""
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):	# the parser prints what it skips
+            start = time.perf_counter()
+            result = run()
+            seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak, result
+
+def per_second(count, seconds):
+    return round(count / seconds, 1) if seconds else None
+
+def benchmark_program(program_file, scanner, repeat):
+    """Time each stage on one program file and return the stage results."""
+    Scanner = SCANNERS[scanner]
+    scan_seconds, scan_peak, tokens = measure(lambda: Scanner(program_file).scan(), repeat)
+    parse_tokens = tokens_from_scanner(tokens)
+    parse_seconds, parse_peak, parser = measure(lambda: run_parser(parse_tokens), repeat)
+    ast = parser.ast
+    blocks = count_blocks(ast)
+    generate_seconds, generate_peak, _ = measure(lambda: story_generator.generate_story(ast), repeat)
+
+    return {
+        "tokens": len(tokens),
+        "blocks": blocks,
+        "errors": len(parser.errors),
+        "stages": {
+            "scan": {
+                "seconds": round(scan_seconds, 6),
+                "tokens_per_sec": per_second(len(tokens), scan_seconds),
+                "peak_memory_bytes": scan_peak,
+            },
+            "parse": {
+                "seconds": round(parse_seconds, 6),
+                "tokens_per_sec": per_second(len(tokens), parse_seconds),
+                "blocks_per_sec": per_second(blocks, parse_seconds),
+                "peak_memory_bytes": parse_peak,
+            },
+            "generate": {
+                "seconds": round(generate_seconds, 6),
+                "blocks_per_sec": per_second(blocks, generate_seconds),
+                "peak_memory_bytes": generate_peak,
+            },
+        },
+    }
+
+def run_parser(tokens):
+    parser = Parser(tokens)
+    parser.parse()
+    return parser
+
+def main():
+    parser = argparse.ArgumentParser(description="ArtLang scanner/parser/generator benchmarks")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="Multipliers for the number of characters and scenes (default: 1 10 100)")
+    parser.add_argument("--characters", type=int, default=10, help="Characters at scale 1 (default: 10)")
+    parser.add_argument("--traits", type=int, default=3, help="Traits per character (default: 3)")
+    parser.add_argument("--scenes", type=int, default=20, help="Scenes at scale 1 (default: 20)")
+    parser.add_argument("--characters-per-scene", type=int, default=2, help="Characters present in each scene (default: 2)")
+    parser.add_argument("--event-length", type=int, default=3, help="Words per event line (default: 3)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of detail lines given an error (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generator (default: 0)")
+    parser.add_argument("--scanner", choices=sorted(SCANNERS), default="regex", help="Scanner backend to time (default: regex)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage, the best is kept (default: 3)")
+    parser.add_argument("--output", "-o", help="Write the JSON results here instead of to stdout")
+    args = parser.parse_args()
+
+    params = {
+        "traits": args.traits,
+        "characters_per_scene": args.characters_per_scene,
+        "event_length": args.event_length,
+        "error_rate": args.error_rate,
+        "seed": args.seed,
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scale in args.scales:
+            characters, scenes = args.characters * scale, args.scenes * scale
+            program_file = os.path.join(work_dir, f"program_{scale}.txt")
+            with open(program_file, "w") as file:
+                file.write(generate_program(characters=characters, scenes=scenes, **params))
+
+            result = {
+                "scale": scale,
+                "characters": characters,
+                "scenes": scenes,
+                "source_bytes": os.path.getsize(program_file),
+            }
+            result.update(benchmark_program(program_file, args.scanner, args.repeat))
+            results.append(result)
+
+            stages = result["stages"]
+            print(f"scale {scale:>6}: {result['tokens']:>9} tokens  "
+                  f"scan {stages['scan']['seconds']:.4f}s  parse {stages['parse']['seconds']:.4f}s  "
+                  f"generate {stages['generate']['seconds']:.4f}s", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scanner": args.scanner,
+        "repeat": args.repeat,
+        "params": dict(params, characters=args.characters, scenes=args.scenes),
+        "results": results,
+    }
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+        print(f"Results written to: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Time how long a fresh `artlang` process takes to start and compile a small program.
+
+Each case runs `python -m artlang ...` as a new process, the way a one-off
+compile job does, and the best and median wall time of --repeat runs is
+reported next to a bare interpreter start. A separate -X importtime run of
+each case lists the artlang modules it imported and the total import time,
+which shows whether the stages are still only loaded when they run. Results
+are written as JSON.
+
+    python benchmarks/startup_benchmark.py --repeat 20 --output startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from generate_program import generate_program
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def cases(program_file, output_folder, cache_dir):
+    """(name, python arguments) for each case to time."""
+    compile_args = ["-m", "artlang", program_file, "--output_folder", output_folder]
+    return [
+        ("interpreter", ["-c", "pass"]),
+        ("import", ["-c", "import artlang.cli"]),
+        ("help", ["-m", "artlang", "--help"]),
+        ("compile", compile_args + ["--no-cache"]),
+        ("compile_story_only", compile_args + ["--no-cache", "--emit", "story"]),
+        ("compile_tokens_only", compile_args + ["--no-cache", "--emit", "tokens"]),
+        # the cache is filled by the first run, so the timed runs are all hits
+        ("compile_cached", compile_args + ["--cache-dir", cache_dir]),
+    ]
+
+def run(arguments, env, extra=()):
+    return subprocess.run([sys.executable, *extra, *arguments], env=env, check=True,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+def import_profile(arguments, env):
+    """Return (artlang modules imported, total import seconds) from a -X importtime run."""
+    stderr = run(arguments, env, ["-X", "importtime"]).stderr
+    modules = set()
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):	# top-level imports; nested ones are in their cumulative time
+            total += int(cumulative)
+        name = name.strip()
+        if name.startswith("artlang"):
+            modules.add(name)
+    return sorted(modules), round(total / 1e6, 6)
+
+def measure(arguments, env, repeat):
+    run(arguments, env)	# warm the OS file cache (and the compile cache)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(arguments, env)
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="ArtLang startup benchmark")
+    parser.add_argument("--characters", type=int, default=10, help="Characters in the program (default: 10)")
+    parser.add_argument("--scenes", type=int, default=20, help="Scenes in the program (default: 20)")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per case (default: 10)")
+    parser.add_argument("--output", "-o", help="Write the JSON results here instead of to stdout")
+    args = parser.parse_args()
+
+    # run the checkout's package, whether or not it is installed
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_DIR, env.get("PYTHONPATH")]))
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        program_file = os.path.join(work_dir, "program.txt")
+        with open(program_file, "w") as file:
+            file.write(generate_program(characters=args.characters, scenes=args.scenes))
+
+        for name, arguments in cases(program_file, os.path.join(work_dir, "out"), os.path.join(work_dir, "cache")):
+            best, median = measure(arguments, env, args.repeat)
+            modules, import_seconds = import_profile(arguments, env)
+            results.append({
+                "case": name,
+                "best_seconds": round(best, 6),
+                "median_seconds": round(median, 6),
+                "import_seconds": import_seconds,
+                "artlang_modules": modules,
+            })
+            print(f"{name:<20} best {best * 1000:7.1f} ms  median {median * 1000:7.1f} ms  "
+                  f"imports {import_seconds * 1000:6.1f} ms  {len(modules)} artlang modules", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "params": {"characters": args.characters, "scenes": args.scenes},
+        "results": results,
+    }
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+        print(f"Results written to: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()